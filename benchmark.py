@@ -0,0 +1,323 @@
+"""
+A reproducible benchmark suite for the Stonehenge and SubtractSquare
+engines.
+
+Micro-benchmarks time single calls on fixed positions; macro-benchmarks time
+whole solves, starting from empty transposition tables and an empty
+SubtractSquare solver each time. Each benchmark reports the best time per
+call over several repeats, which is the least noisy estimate on a shared
+machine. Results can be saved as a JSON baseline and later runs compared
+with it:
+
+    python benchmark.py --save benchmark_baseline.json
+    (make a change)
+    python benchmark.py --compare benchmark_baseline.json
+
+A benchmark that is slower than its baseline by more than the threshold is
+flagged as a regression, and makes the comparison exit with status 1.
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple, Union
+import strategy
+from stonehenge import StonehengeGame, StonehengeState, is_winner
+from subtract_square_game import SubtractSquareGame
+from subtract_square_state import SubtractSquareState
+from subtract_square_solver import SOLVER, winning_totals
+
+# Moves from an empty board of size 3, p2 first, to the position of
+# STONEHENGE_MINIMAX_BOARD in minimax_unittest_basic.py
+MINIMAX_BOARD_MOVES = ['K', 'A', 'C', 'B', 'F', 'E', 'G', 'D', 'I']
+
+
+class Benchmark(NamedTuple):
+    """
+    A named benchmark.
+
+    name - unique name of the benchmark
+    kind - 'micro' or 'macro'
+    setup - a function returning the function to time, with its fixtures
+            already built
+    number - calls per timing, so that each timing is long enough to measure
+    """
+    name: str
+    kind: str
+    setup: Callable[[], Callable[[], Any]]
+    number: int
+
+
+def random_state(rng: random.Random, board_size: int, num_moves: int,
+                 p1_turn: Union[bool, None] = None) -> StonehengeState:
+    """
+    Return the Stonehenge state reached by up to num_moves moves chosen
+    with rng, from an empty board of size board_size, stopping early if the
+    game ends. p1 moves first if p1_turn is True and p2 if it is False; by
+    default, rng chooses. The unit tests share these positions.
+
+    >>> state = random_state(random.Random(0), 5, 10, True)
+    >>> state == random_state(random.Random(0), 5, 10, True)
+    True
+    >>> bin(state.p1_cells | state.p2_cells).count('1')
+    10
+    """
+    if p1_turn is None:
+        p1_turn = rng.random() < 0.5
+    state = StonehengeState(p1_turn, board_size)
+    for _ in range(num_moves):
+        moves = state.get_possible_moves()
+        if not moves:
+            break
+        state = state.make_move(rng.choice(moves))
+    return state
+
+
+def minimax_board_game() -> StonehengeGame:
+    """
+    Return a game at the position of STONEHENGE_MINIMAX_BOARD.
+    """
+    game = StonehengeGame(False, 3)
+    for move in MINIMAX_BOARD_MOVES:
+        game.current_state = game.current_state.make_move(move)
+    return game
+
+
+def solve(strategy_: Callable[[Any], Any], game: Any) -> Callable[[], Any]:
+    """
+    Return a function that finds strategy_'s move for game from empty
+    transposition tables and a fresh SubtractSquare solver.
+    """
+    def run() -> Any:
+        strategy.TRANSPOSITION_TABLE.clear()
+        strategy.ALPHA_BETA_TABLE.clear()
+        SOLVER.clear()
+        return strategy_(game)
+    return run
+
+
+def _make_move() -> Callable[[], Any]:
+    """
+    Return a make_move call on a board of size 5 with 10 cells claimed.
+    """
+    state = random_state(random.Random(0), 5, 10, True)
+    move = state.get_possible_moves()[0]
+    return lambda: state.make_move(move)
+
+
+def _get_possible_moves() -> Callable[[], Any]:
+    """
+    Return get_possible_moves on a board of size 5 with 10 cells claimed.
+    """
+    return random_state(random.Random(0), 5, 10, True).get_possible_moves
+
+
+def _is_winner() -> Callable[[], Any]:
+    """
+    Return an is_winner call on a board of size 5 with 20 cells claimed.
+    """
+    state = random_state(random.Random(0), 5, 20, True)
+    return lambda: is_winner(state, 1)
+
+
+def _repr() -> Callable[[], Any]:
+    """
+    Return __repr__ of a board of size 5 with 10 cells claimed.
+    """
+    return random_state(random.Random(0), 5, 10, True).__repr__
+
+
+def _rough_outcome() -> Callable[[], Any]:
+    """
+    Return rough_outcome of a board of size 5 with 10 cells claimed.
+    """
+    return random_state(random.Random(0), 5, 10, True).rough_outcome
+
+
+def _subtract_square_moves() -> Callable[[], Any]:
+    """
+    Return get_possible_moves of SubtractSquare at a total of 2000.
+    """
+    return SubtractSquareState(True, 2000).get_possible_moves
+
+
+def _subtract_square_rough_outcome() -> Callable[[], Any]:
+    """
+    Return rough_outcome of SubtractSquare at a total of 2000.
+    """
+    return SubtractSquareState(True, 2000).rough_outcome
+
+
+def _minimax_board(strategy_: Callable) -> Callable[[], Callable[[], Any]]:
+    """
+    Return a setup for solving STONEHENGE_MINIMAX_BOARD with strategy_.
+    """
+    return lambda: solve(strategy_, minimax_board_game())
+
+
+def _stonehenge_3_opening(strategy_: Callable) -> Callable[[],
+                                                           Callable[[], Any]]:
+    """
+    Return a setup for solving a board of size 3 after A, L with
+    strategy_.
+    """
+    def setup() -> Callable[[], Any]:
+        game = StonehengeGame(True, 3)
+        for move in ['A', 'L']:
+            game.current_state = game.current_state.make_move(move)
+        return solve(strategy_, game)
+    return setup
+
+
+def _subtract_square_minimax() -> Callable[[], Any]:
+    """
+    Return a minimax solve of SubtractSquare from a total of 100000.
+    """
+    return solve(strategy.recursive_minimax_strategy,
+                 SubtractSquareGame(True, 100000))
+
+
+BENCHMARKS = [
+    Benchmark('stonehenge.make_move', 'micro', _make_move, 10000),
+    Benchmark('stonehenge.get_possible_moves', 'micro', _get_possible_moves,
+              10000),
+    Benchmark('stonehenge.is_winner', 'micro', _is_winner, 10000),
+    Benchmark('stonehenge.repr', 'micro', _repr, 1000),
+    Benchmark('stonehenge.rough_outcome', 'micro', _rough_outcome, 100),
+    Benchmark('subtract_square.get_possible_moves', 'micro',
+              _subtract_square_moves, 10000),
+    Benchmark('subtract_square.rough_outcome', 'micro',
+              _subtract_square_rough_outcome, 1000),
+    Benchmark('minimax_board.recursive', 'macro',
+              _minimax_board(strategy.recursive_minimax_strategy), 10),
+    Benchmark('minimax_board.iterative', 'macro',
+              _minimax_board(strategy.iterative_minimax_strategy), 10),
+    Benchmark('stonehenge_3_opening.recursive', 'macro',
+              _stonehenge_3_opening(strategy.recursive_minimax_strategy), 1),
+    Benchmark('stonehenge_3_opening.alpha_beta', 'macro',
+              _stonehenge_3_opening(strategy.alpha_beta_strategy), 1),
+    Benchmark('subtract_square_100000.recursive', 'macro',
+              _subtract_square_minimax, 10),
+    Benchmark('subtract_square.winning_totals_1000000', 'macro',
+              lambda: lambda: winning_totals(1000000), 1),
+]
+
+
+def run_benchmarks(names: Union[List[str], None] = None, repeat: int = 5,
+                   out: Any = None) -> Dict[str, float]:
+    """
+    Return the best time, in seconds per call, over repeat timings, of each
+    benchmark whose name contains one of names or whose kind is one of names
+    (or of every benchmark, if names is empty or None). Progress is printed
+    to out, if given.
+    """
+    results = {}
+    for benchmark in BENCHMARKS:
+        if names and not any(name in benchmark.name or name == benchmark.kind
+                             for name in names):
+            continue
+        timer = timeit.Timer(benchmark.setup())
+        best = min(timer.repeat(repeat, benchmark.number)) / benchmark.number
+        results[benchmark.name] = best
+        if out is not None:
+            print('{:45} {:>12}'.format(benchmark.name, format_time(best)),
+                  file=out)
+    return results
+
+
+def format_time(seconds: float) -> str:
+    """
+    Return seconds formatted with a unit suited to its size.
+
+    >>> format_time(0.0000021)
+    '2.10us'
+    >>> format_time(1.5)
+    '1.500s'
+    """
+    if seconds < 1e-3:
+        return '{:.2f}us'.format(seconds * 1e6)
+    elif seconds < 1:
+        return '{:.2f}ms'.format(seconds * 1e3)
+    return '{:.3f}s'.format(seconds)
+
+
+def environment() -> Dict[str, str]:
+    """
+    Return a description of the machine and interpreter running the
+    benchmarks, saved with a baseline since timings only compare on the
+    same ones.
+    """
+    return {'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(), 'system': platform.system()}
+
+
+def save_baseline(path: str, results: Dict[str, float]) -> None:
+    """
+    Write results to path as a JSON baseline.
+    """
+    with open(path, 'w') as file:
+        json.dump({'environment': environment(), 'results': results}, file,
+                  indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> Dict[str, float]:
+    """
+    Return the results of the JSON baseline at path.
+    """
+    with open(path) as file:
+        return json.load(file)['results']
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float],
+            threshold: float = 0.1) -> List[Tuple[str, float]]:
+    """
+    Return the name and relative change from baseline of every benchmark in
+    results that is slower than in baseline by more than threshold (a
+    fraction of the baseline time).
+
+    >>> compare({'a': 1.2, 'b': 1.0, 'c': 5.0}, {'a': 1.0, 'b': 1.0})
+    [('a', 0.19999999999999996)]
+    """
+    regressions = []
+    for name, seconds in results.items():
+        if name in baseline:
+            change = seconds / baseline[name] - 1
+            if change > threshold:
+                regressions.append((name, change))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark the Stonehenge and SubtractSquare engines.')
+    parser.add_argument('names', nargs='*',
+                        help='only run benchmarks whose names contain one of '
+                             'these, or of these kinds (micro or macro)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='timings per benchmark; the best is kept')
+    parser.add_argument('--save', metavar='PATH',
+                        help='save the results as a baseline at PATH')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='flag regressions against the baseline at PATH')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='slowdown, as a fraction, that counts as a '
+                             'regression')
+    args = parser.parse_args()
+    timings = run_benchmarks(args.names, args.repeat, sys.stdout)
+    if args.save:
+        save_baseline(args.save, timings)
+    if args.compare:
+        previous = load_baseline(args.compare)
+        for bench, seconds in timings.items():
+            if bench in previous:
+                print('{:45} {:>+8.1%}'.format(
+                    bench, seconds / previous[bench] - 1))
+        slower = compare(timings, previous, args.threshold)
+        for bench, change in slower:
+            print('REGRESSION: {} is {:.1%} slower'.format(bench, change))
+        sys.exit(1 if slower else 0)
@@ -1,7 +1,7 @@
 """
 Superclass Game
 """
-from typing import Any
+from typing import Any, Union
 from game_state import GameState
 
 
@@ -16,6 +16,16 @@ class Game:
         """
         raise NotImplementedError
 
+    @classmethod
+    def from_state(cls, state: GameState) -> 'Game':
+        """
+        Return a game of this class whose current state is state, without
+        asking for any input.
+        """
+        game = cls.__new__(cls)
+        game.current_state = state
+        return game
+
     def get_instructions(self) -> str:
         """
         Return the instructions for this Game.
@@ -36,6 +46,37 @@ class Game:
         """
         raise NotImplementedError
 
+    def winner(self, state: GameState) -> Union[str, None]:
+        """
+        Return the player, 'p1' or 'p2', who has won this game at state, or
+        None if neither has (or both have).
+
+        This default asks is_winner, which looks at current_state, and so
+        briefly replaces current_state with state: it is not safe to use
+        while another search shares this game. Subclasses should override it
+        to look at state alone.
+        """
+        old_state = self.current_state
+        self.current_state = state
+        try:
+            p1_won, p2_won = self.is_winner('p1'), self.is_winner('p2')
+        finally:
+            self.current_state = old_state
+        if p1_won != p2_won:
+            return 'p1' if p1_won else 'p2'
+        return None
+
+    def terminal_value(self, state: GameState) -> int:
+        """
+        Return the score of state, a state where this game is over, for the
+        player whose turn it is at state: 1 for a win, -1 for a loss and 0
+        for a draw. Safe to call from concurrent searches if winner is.
+        """
+        winner = self.winner(state)
+        if winner is None:
+            return 0
+        return 1 if winner == state.get_current_player_name() else -1
+
     def str_to_move(self, string: str) -> Any:
         """
         Return the move that string represents. If string is not a move,
@@ -9,8 +9,11 @@ strategy cannot be used on Chopsticks unless you account for infinite loops.
 your own curiousity!)
 """
 from strategy import interactive_strategy, recursive_minimax_strategy,\
-    iterative_minimax_strategy, rough_outcome_strategy
+    iterative_minimax_strategy, rough_outcome_strategy, alpha_beta_strategy,\
+    iterative_deepening_strategy, parallel_minimax_strategy
 from typing import Any, Callable
+from mcts import mcts_strategy
+from tablebase import tablebase_strategy
 from stonehenge import StonehengeGame
 from subtract_square_game import SubtractSquareGame
 
@@ -20,10 +23,20 @@ playable_games = {'s': SubtractSquareGame,
 
 # 'mr' should map to your recursive implementation of minimax while
 # 'mi' should map to your iterative implementation of minimax
+# 'ab' maps to minimax with alpha-beta pruning
+# 'id' maps to iterative deepening with a time limit for each move
+# 'mp' maps to minimax solved in parallel across processes
+# 'mc' maps to Monte Carlo Tree Search
+# 'tb' maps to endgame tablebase lookups (see tablebase.py)
 usable_strategies = {'i': interactive_strategy,
                      'ro': rough_outcome_strategy,
                      'mr': recursive_minimax_strategy,
-                     'mi': iterative_minimax_strategy}
+                     'mi': iterative_minimax_strategy,
+                     'ab': alpha_beta_strategy,
+                     'id': iterative_deepening_strategy,
+                     'mp': parallel_minimax_strategy,
+                     'mc': mcts_strategy,
+                     'tb': tablebase_strategy}
 
 
 class GameInterface:
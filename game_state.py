@@ -3,22 +3,43 @@ The GameState superclass.
 
 NOTE: You do not have to run python-ta on this file.
 """
-from typing import Any
+import random
+from typing import Any, List, Union
+
+
+def zobrist_keys(count: int, seed: int) -> List[int]:
+    """
+    Return count pseudo-random 64-bit keys for Zobrist hashing. The same
+    count and seed give the same keys in every process.
+
+    >>> zobrist_keys(3, 0) == zobrist_keys(3, 0)
+    True
+    >>> all(0 <= key < 2 ** 64 for key in zobrist_keys(3, 0))
+    True
+    """
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(count)]
 
 
 class GameState:
     """
     The state of a game at a certain point in time.
 
+    States are hashable and compare equal when they are the same position,
+    so they can be used as dict keys and set members.
+
     WIN - score if player is in a winning position
     LOSE - score if player is in a losing position
     DRAW - score if player is in a tied position
     p1_turn - whether it is p1's turn or not
+    zobrist - a 64-bit hash of this position, which subclasses keep up to
+              date as moves are made
     """
     WIN: int = 1
     LOSE: int = -1
     DRAW: int = 0
     p1_turn: bool
+    zobrist: int
 
     def __init__(self, is_p1_turn: bool) -> None:
         """
@@ -40,6 +61,14 @@ class GameState:
         """
         raise NotImplementedError
 
+    def get_ordered_moves(self) -> list:
+        """
+        Return all possible moves that can be applied to this state, most
+        promising first. Searches that prune use this to try good moves
+        early; by default moves keep the order of get_possible_moves.
+        """
+        return self.get_possible_moves()
+
     def get_current_player_name(self) -> str:
         """
         Return 'p1' if the current player is Player 1, and 'p2' if the current
@@ -68,6 +97,48 @@ class GameState:
         """
         raise NotImplementedError
 
+    def known_score(self) -> Union[int, None]:
+        """
+        Return the score of this state for the current player if it is known
+        without searching, such as from a solved table of positions, or None
+        otherwise. Searches stop at states whose score is known.
+        """
+        return None
+
+    def canonical(self) -> 'GameState':
+        """
+        Return the representative of the positions equivalent to this state
+        under the symmetries of its game, all of which have the same score.
+        By default a state is only equivalent to itself.
+        """
+        return self
+
+    def __eq__(self, other: Any) -> bool:
+        """
+        Return whether other is the same position as this GameState.
+        Subclasses should override this to compare their fields directly.
+        """
+        return type(self) is type(other) and \
+            self.zobrist == other.zobrist and repr(self) == repr(other)
+
+    def __hash__(self) -> int:
+        """
+        Return a hash of this GameState, consistent with __eq__.
+        """
+        return self.zobrist
+
+    def playout(self, rng: random.Random) -> 'GameState':
+        """
+        Return the state reached by making moves chosen uniformly at random
+        with rng, starting from this state, until no moves are left.
+        """
+        state = self
+        moves = state.get_possible_moves()
+        while moves:
+            state = state.make_move(rng.choice(moves))
+            moves = state.get_possible_moves()
+        return state
+
     def rough_outcome(self) -> float:
         """
         Return an estimate in interval [LOSE, WIN] of best outcome the current
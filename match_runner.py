@@ -0,0 +1,223 @@
+"""
+Play many games between two strategies without anyone at the keyboard.
+
+Games are spread across a pool of processes, one game at a time per
+process, and the results are gathered into a MatchSummary of wins, draws
+and losses and of how long each strategy took per move. From the command
+line, for example
+
+    python match_runner.py h ab mc --parameter 2 --games 200
+
+plays 200 games of Stonehenge on a board of size 2 between alpha-beta and
+Monte Carlo Tree Search, alternating which of them moves first. With
+--cache PATH, every process solves positions for the recursive and iterative
+minimax strategies in the PersistentTable at PATH instead of a table of its
+own, so a position solved by one game is known to all the others, and to
+later matches using the same file.
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Union
+import strategy
+from game_interface import playable_games, usable_strategies
+from persistent_table import PersistentTable
+
+
+class GameRecord(NamedTuple):
+    """
+    The outcome of one game played by play_game.
+
+    winner - 'p1', 'p2', or None for a draw
+    p1_starts - whether p1 made the first move
+    p1_times - seconds p1's strategy took for each of its moves
+    p2_times - seconds p2's strategy took for each of its moves
+    """
+    winner: Union[str, None]
+    p1_starts: bool
+    p1_times: List[float]
+    p2_times: List[float]
+
+
+def make_game(game_key: str, p1_starts: bool, parameter: int) -> Any:
+    """
+    Return a new game of the playable game at game_key, where parameter is
+    the number the game would otherwise ask for at the keyboard (the
+    starting total, or the length of the board's sides).
+    """
+    return playable_games[game_key](p1_starts, parameter)
+
+
+def play_game(game_key: str, parameter: int, p1: str, p2: str,
+              p1_starts: bool) -> GameRecord:
+    """
+    Return the record of one game of the playable game at game_key, played
+    between the usable strategies at p1 and p2.
+
+    >>> play_game('s', 9, 'mr', 'ro', True).winner
+    'p1'
+    """
+    game = make_game(game_key, p1_starts, parameter)
+    strategies = {'p1': usable_strategies[p1], 'p2': usable_strategies[p2]}
+    times: Dict[str, List[float]] = {'p1': [], 'p2': []}
+    state = game.current_state
+    while not game.is_over(state):
+        player = state.get_current_player_name()
+        start = time.perf_counter()
+        move = strategies[player](game)
+        times[player].append(time.perf_counter() - start)
+        if not state.is_valid_move(move):
+            raise ValueError('{} made the invalid move {!r}'.format(
+                usable_strategies[p1 if player == 'p1' else p2].__name__,
+                move))
+        state = state.make_move(move)
+        game.current_state = state
+    winner = 'p1' if game.is_winner('p1') else \
+        'p2' if game.is_winner('p2') else None
+    return GameRecord(winner, p1_starts, times['p1'], times['p2'])
+
+
+def mean(times: List[float]) -> float:
+    """
+    Return the mean of times, or 0.0 if there are none.
+
+    >>> mean([1.0, 2.0])
+    1.5
+    """
+    return sum(times) / len(times) if times else 0.0
+
+
+class MatchSummary:
+    """
+    The aggregate results of games between two strategies.
+
+    p1 - key of the strategy playing as p1
+    p2 - key of the strategy playing as p2
+    wins - number of games won, by player, with None counting draws
+    p1_times - seconds p1's strategy took for each move, over every game
+    p2_times - seconds p2's strategy took for each move, over every game
+    """
+    p1: str
+    p2: str
+    wins: Dict[Union[str, None], int]
+    p1_times: List[float]
+    p2_times: List[float]
+
+    def __init__(self, p1: str, p2: str) -> None:
+        """
+        Create an empty summary of games between the strategies p1 and p2.
+        """
+        self.p1, self.p2 = p1, p2
+        self.wins = {'p1': 0, 'p2': 0, None: 0}
+        self.p1_times, self.p2_times = [], []
+
+    def __len__(self) -> int:
+        """
+        Return the number of games in this summary.
+        """
+        return sum(self.wins.values())
+
+    def add(self, record: GameRecord) -> None:
+        """
+        Add the outcome of the game in record to this summary.
+        """
+        self.wins[record.winner] += 1
+        self.p1_times.extend(record.p1_times)
+        self.p2_times.extend(record.p2_times)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return this summary as a dict of plain values, ready for json.
+        """
+        result = {'games': len(self), 'draws': self.wins[None]}
+        for player, key, times in [('p1', self.p1, self.p1_times),
+                                   ('p2', self.p2, self.p2_times)]:
+            result[player] = {'strategy': key, 'wins': self.wins[player],
+                              'moves': len(times),
+                              'mean_move_time': mean(times),
+                              'max_move_time': max(times, default=0.0)}
+        return result
+
+    def __str__(self) -> str:
+        """
+        Return a report of this summary, one line per strategy.
+        """
+        lines = ['{} games, {} drawn'.format(len(self), self.wins[None])]
+        for player, key, times in [('p1', self.p1, self.p1_times),
+                                   ('p2', self.p2, self.p2_times)]:
+            lines.append(
+                '{} ({}): {} wins, {} moves, {:.2f}ms mean, {:.2f}ms max '
+                'per move'.format(player, usable_strategies[key].__name__,
+                                  self.wins[player], len(times),
+                                  1000 * mean(times),
+                                  1000 * max(times, default=0.0)))
+        return '\n'.join(lines)
+
+
+def use_cache(path: str) -> None:
+    """
+    Make the minimax strategies of this process solve positions in the
+    PersistentTable at path, creating it if needed, in place of
+    strategy.TRANSPOSITION_TABLE.
+    """
+    strategy.TRANSPOSITION_TABLE = PersistentTable(path)
+
+
+def run_match(game_key: str, parameter: int, p1: str, p2: str,
+              num_games: int, p1_starts: Union[bool, None] = None,
+              max_workers: Union[int, None] = None,
+              cache: Union[str, None] = None) -> MatchSummary:
+    """
+    Return the summary of num_games games of the playable game at game_key
+    between the usable strategies at p1 and p2, played across max_workers
+    processes (by default, one per CPU). p1 moves first if p1_starts is
+    True and second if it is False; by default the first move alternates
+    between them, starting with p1. If cache is given, every process shares
+    the PersistentTable at that path, as set up by use_cache.
+    """
+    if 'i' in (p1, p2):
+        raise ValueError('the interactive strategy cannot play headless')
+    starts = [p1_starts if p1_starts is not None else i % 2 == 0
+              for i in range(num_games)]
+    summary = MatchSummary(p1, p2)
+    with ProcessPoolExecutor(max_workers,
+                             initializer=None if cache is None else use_cache,
+                             initargs=(cache,)) as executor:
+        for record in executor.map(play_game, [game_key] * num_games,
+                                   [parameter] * num_games, [p1] * num_games,
+                                   [p2] * num_games, starts):
+            summary.add(record)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Play games between two strategies without input.')
+    parser.add_argument('game', choices=sorted(playable_games),
+                        help='key of the game to play')
+    parser.add_argument('p1', choices=sorted(set(usable_strategies) - {'i'}),
+                        help='key of the strategy for player 1')
+    parser.add_argument('p2', choices=sorted(set(usable_strategies) - {'i'}),
+                        help='key of the strategy for player 2')
+    parser.add_argument('--parameter', type=int, required=True,
+                        help="the starting total, or the board's side length")
+    parser.add_argument('--games', type=int, default=100,
+                        help='number of games to play')
+    parser.add_argument('--first', choices=['alternate', 'p1', 'p2'],
+                        default='alternate', help='who moves first')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of processes (default: one per CPU)')
+    parser.add_argument('--cache', metavar='PATH', default=None,
+                        help='share solved positions through the file at '
+                             'PATH')
+    parser.add_argument('--json', action='store_true',
+                        help='print the summary as JSON')
+    args = parser.parse_args()
+    result = run_match(args.game, args.parameter, args.p1, args.p2,
+                       args.games, {'alternate': None, 'p1': True,
+                                    'p2': False}[args.first], args.workers,
+                       args.cache)
+    print(json.dumps(result.to_dict(), indent=2) if args.json else result)
@@ -0,0 +1,58 @@
+"""
+Unittests for the headless match runner.
+"""
+import os
+import tempfile
+import unittest
+
+from match_runner import play_game, run_match
+from persistent_table import PersistentTable
+from stonehenge import StonehengeState
+
+
+class MatchRunnerUnitTests(unittest.TestCase):
+    def test_play_game_records_every_move(self):
+        """
+        Test that a game's record has one timing per move of each player.
+        """
+        record = play_game('h', 2, 'ab', 'ro', False)
+        self.assertIn(record.winner, ['p1', 'p2'])
+        self.assertFalse(record.p1_starts)
+        self.assertIn(len(record.p2_times) - len(record.p1_times), [0, 1])
+
+    def test_run_match_alternates_first_player(self):
+        """
+        Test that perfect players win every game of SubtractSquare they can,
+        with the first move alternating by default.
+        """
+        summary = run_match('s', 20, 'mr', 'ab', 4, max_workers=2)
+        self.assertEqual(len(summary), 4)
+        # 20 is lost by whoever moves first, so each side wins twice.
+        self.assertEqual(summary.wins, {'p1': 2, 'p2': 2, None: 0})
+
+    def test_workers_share_cache(self):
+        """
+        Test that with a cache, the positions solved by the workers are
+        stored in the file, and a later match finds them there.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'positions.cache')
+            summary = run_match('h', 2, 'mr', 'mi', 2, max_workers=2,
+                                cache=path)
+            self.assertEqual(len(summary), 2)
+            with PersistentTable(path) as table:
+                self.assertIsNotNone(table.get(
+                    StonehengeState(False, 2).make_move('A')))
+            self.assertEqual(run_match('h', 2, 'mr', 'mi', 2, max_workers=2,
+                                       cache=path).wins, summary.wins)
+
+    def test_interactive_strategy_rejected(self):
+        """
+        Test that the interactive strategy cannot be used headless.
+        """
+        with self.assertRaises(ValueError):
+            run_match('s', 20, 'i', 'mr', 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Monte Carlo Tree Search (UCT) for two-player games.
+
+The search tree grows by one node per iteration and each new node is scored
+by a batch of random playouts, made with GameState.playout so that they
+never go through a game interface.
+"""
+import math
+import random
+import time
+from typing import Any, List, Union
+from search_stats import SearchStats, phase
+
+
+class MCTSNode:
+    """
+    A node of a Monte Carlo search tree.
+
+    state - the game state at this node
+    move - the move that led to this node from its parent
+    parent - the parent node, or None at the root
+    children - expanded child nodes
+    untried - moves from state that have no child node yet
+    visits - number of playouts made through this node
+    value - total reward of those playouts for the player who made move
+    """
+    __slots__ = ('state', 'move', 'parent', 'children', 'untried', 'visits',
+                 'value')
+    state: Any
+    move: Any
+    parent: Union['MCTSNode', None]
+    children: List['MCTSNode']
+    untried: List[Any]
+    visits: int
+    value: float
+
+    def __init__(self, state: Any, move: Any = None,
+                 parent: Union['MCTSNode', None] = None) -> None:
+        """
+        Create an unvisited MCTSNode for state, reached by move from parent.
+        """
+        self.state = state
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = state.get_possible_moves()
+        self.visits = 0
+        self.value = 0.0
+
+    def select_child(self, exploration: float) -> 'MCTSNode':
+        """
+        Return the child of this node with the highest UCB1 score.
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children,
+                   key=lambda c: c.value / c.visits +
+                   exploration * math.sqrt(log_visits / c.visits))
+
+
+def reward(game: Any, final: Any, p1: bool) -> float:
+    """
+    Return the reward in [0, 1] of final, a state where game is over, for
+    player 1 if p1 is True and player 2 otherwise.
+    """
+    score = game.terminal_value(final)
+    if final.p1_turn != p1:
+        score = -score
+    return (score + 1) / 2
+
+
+def mcts_strategy(game: Any, iterations: int = 2000,
+                  time_limit: Union[float, None] = 1.0, playouts: int = 4,
+                  exploration: float = math.sqrt(2),
+                  seed: Union[int, None] = None,
+                  stats: Union[SearchStats, None] = None) -> Any:
+    """
+    Return a move for game found by Monte Carlo Tree Search with UCT. The
+    search stops after iterations iterations or time_limit seconds,
+    whichever comes first, and each new node is scored by playouts random
+    playouts. The move returned is the most visited one from the current
+    state.
+
+    The search is recorded in stats, if given: each tree node is a visited
+    node, a node is expanded, into as many children as it has moves, when
+    its first child is added, and the wall time is the 'search' phase.
+    """
+    deadline = None if time_limit is None else \
+        time.perf_counter() + time_limit
+    rng = random.Random(seed)
+    root = MCTSNode(game.current_state)
+    if stats is not None:
+        stats.visit(0)
+    with phase(stats, 'search'):
+        for _ in range(iterations):
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            # Select a node to expand, following UCB1 down the tree
+            node, depth = root, 0
+            while not node.untried and node.children:
+                node, depth = node.select_child(exploration), depth + 1
+            # Expand it by one untried move
+            if node.untried:
+                if stats is not None and not node.children:
+                    stats.expand(len(node.untried))
+                move = node.untried.pop(rng.randrange(len(node.untried)))
+                child = MCTSNode(node.state.make_move(move), move, node)
+                node.children.append(child)
+                node, depth = child, depth + 1
+                if stats is not None:
+                    stats.visit(depth)
+                    if game.is_over(child.state):
+                        stats.terminal += 1
+            # Score the new node with a batch of random playouts, for the
+            # player who moved into it
+            mover = not node.state.p1_turn
+            total = sum(reward(game, node.state.playout(rng), mover)
+                        for _ in range(playouts))
+            if stats is not None:
+                stats.playouts += playouts
+            # Back the rewards up the path, switching player at every level
+            while node is not None:
+                node.visits += playouts
+                node.value += total
+                total = playouts - total
+                node = node.parent
+    if not root.children:
+        return root.untried[0]
+    return max(root.children, key=lambda c: c.visits).move
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,171 @@
+"""
+Perft: count the positions reachable in a fixed number of moves, to check
+that a change to move generation leaves the game tree exactly as it was,
+and to measure how fast states are generated.
+
+perft(game, state, depth) walks every sequence of up to depth moves from
+state, without any caching, and counts the leaves of that tree: the
+positions depth moves away, and the positions where the game ended sooner.
+The leaves are broken down by whether the game is over there and, if so, by
+who won. REFERENCE holds counts for empty Stonehenge boards of sizes 1 to 3,
+recorded from the original implementation of StonehengeState. Check them,
+and time the walk, with
+
+    python perft.py --verify
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import argparse
+import sys
+import time
+from typing import Any, Dict, NamedTuple, Tuple
+from stonehenge import StonehengeGame, StonehengeState
+
+
+class PerftCounts(NamedTuple):
+    """
+    The leaves of a perft walk, by outcome.
+
+    ongoing - leaves where the game is not over
+    p1_wins - leaves where the game is over and p1 has won
+    p2_wins - leaves where the game is over and p2 has won
+    draws - leaves where the game is over and nobody has won
+    """
+    ongoing: int
+    p1_wins: int
+    p2_wins: int
+    draws: int
+
+    @property
+    def terminal(self) -> int:
+        """
+        Return the number of leaves where the game is over.
+        """
+        return self.p1_wins + self.p2_wins + self.draws
+
+    @property
+    def leaves(self) -> int:
+        """
+        Return the number of leaves.
+        """
+        return self.ongoing + self.terminal
+
+
+def perft(game: Any, state: Any, depth: int) -> PerftCounts:
+    """
+    Return the counts of the leaves of the tree of every sequence of up to
+    depth moves from state, a state of game.
+
+    >>> counts = perft(StonehengeGame(True, 2), StonehengeState(True, 2), 4)
+    >>> counts.leaves, counts.terminal, counts.p1_wins, counts.p2_wins
+    (786, 30, 18, 12)
+    """
+    totals = [0, 0, 0, 0]
+    _walk(game, state, depth, totals)
+    return PerftCounts(*totals)
+
+
+def _walk(game: Any, state: Any, depth: int, totals: list) -> int:
+    """
+    Add the leaves below state, depth moves deep, to totals, indexed as the
+    fields of PerftCounts, and return the number of states visited.
+    """
+    if game.is_over(state):
+        winner = game.winner(state)
+        if winner is None:
+            totals[3] += 1
+        elif winner == 'p1':
+            totals[1] += 1
+        else:
+            totals[2] += 1
+        return 1
+    if depth == 0:
+        totals[0] += 1
+        return 1
+    visited = 1
+    for move in state.get_possible_moves():
+        visited += _walk(game, state.make_move(move), depth - 1, totals)
+    return visited
+
+
+def timed_perft(game: Any, state: Any,
+                depth: int) -> Tuple[PerftCounts, int, float]:
+    """
+    Return the counts of perft(game, state, depth), the number of states
+    visited and the seconds taken.
+    """
+    totals = [0, 0, 0, 0]
+    start = time.perf_counter()
+    visited = _walk(game, state, depth, totals)
+    return PerftCounts(*totals), visited, time.perf_counter() - start
+
+
+# Perft counts from an empty Stonehenge board, p1 to move, by
+# (board size, depth)
+REFERENCE: Dict[Tuple[int, int], PerftCounts] = {
+    (1, 1): PerftCounts(0, 3, 0, 0),
+    (1, 2): PerftCounts(0, 3, 0, 0),
+    (2, 1): PerftCounts(7, 0, 0, 0),
+    (2, 2): PerftCounts(42, 0, 0, 0),
+    (2, 3): PerftCounts(192, 18, 0, 0),
+    (2, 4): PerftCounts(756, 18, 12, 0),
+    (2, 5): PerftCounts(1128, 1158, 12, 0),
+    (2, 6): PerftCounts(1440, 1158, 828, 0),
+    (2, 7): PerftCounts(0, 2598, 828, 0),
+    (3, 1): PerftCounts(12, 0, 0, 0),
+    (3, 2): PerftCounts(132, 0, 0, 0),
+    (3, 3): PerftCounts(1320, 0, 0, 0),
+    (3, 4): PerftCounts(11880, 0, 0, 0),
+    (3, 5): PerftCounts(95040, 0, 0, 0),
+    (3, 6): PerftCounts(665280, 0, 0, 0),
+    (3, 7): PerftCounts(3785652, 206028, 0, 0),
+}
+
+
+def verify(max_seconds: float = 60.0, out: Any = sys.stdout) -> bool:
+    """
+    Return whether perft matches every count in REFERENCE, printing each
+    result and the rate at which states were visited to out. Counts
+    expected to take longer than max_seconds are skipped, judging by the
+    rate so far.
+    """
+    matches, rate = True, None
+    for (board_size, depth), expected in sorted(REFERENCE.items()):
+        nodes = sum(expected)
+        if rate is not None and nodes / rate > max_seconds:
+            print('size {} depth {}: skipped'.format(board_size, depth),
+                  file=out)
+            continue
+        game = StonehengeGame(True, board_size)
+        counts, visited, seconds = timed_perft(game, game.current_state,
+                                               depth)
+        rate = visited / seconds if seconds else None
+        print('size {} depth {}: {} leaves, {}, {:,.0f} nodes/s'.format(
+            board_size, depth, counts.leaves,
+            'ok' if counts == expected else
+            'MISMATCH, expected {}'.format(expected), rate or 0), file=out)
+        matches = matches and counts == expected
+    return matches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Count the positions reachable on a Stonehenge board.')
+    parser.add_argument('--size', type=int, default=3,
+                        help="length of the board's sides")
+    parser.add_argument('--depth', type=int, default=4,
+                        help='number of moves to look ahead')
+    parser.add_argument('--verify', action='store_true',
+                        help='check perft against the reference counts')
+    parser.add_argument('--max-seconds', type=float, default=60.0,
+                        help='skip reference counts expected to take longer')
+    args = parser.parse_args()
+    if args.verify:
+        sys.exit(0 if verify(args.max_seconds) else 1)
+    board = StonehengeGame(True, args.size)
+    result, num_visited, elapsed = timed_perft(board, board.current_state,
+                                               args.depth)
+    print('{}\n{} leaves, {} terminal, {} states visited in {:.3f}s '
+          '({:,.0f} nodes/s)'.format(result, result.leaves, result.terminal,
+                                     num_visited, elapsed,
+                                     num_visited / elapsed if elapsed else 0))
@@ -0,0 +1,37 @@
+"""
+Unittests for Stonehenge move generation, checked with perft against the
+counts recorded from the original implementation.
+"""
+import unittest
+
+from perft import REFERENCE, perft
+from stonehenge import StonehengeGame
+
+
+class PerftUnitTests(unittest.TestCase):
+    def test_reference_counts(self):
+        """
+        Test that perft from an empty board matches every reference count
+        small enough to run quickly.
+        """
+        for (board_size, depth), expected in sorted(REFERENCE.items()):
+            if sum(expected) > 20000:
+                continue
+            with self.subTest(board_size=board_size, depth=depth):
+                game = StonehengeGame(True, board_size)
+                self.assertEqual(perft(game, game.current_state, depth),
+                                 expected)
+
+    def test_p2_starting_mirrors_p1(self):
+        """
+        Test that when p2 moves first the counts of wins are swapped.
+        """
+        game = StonehengeGame(False, 2)
+        counts = perft(game, game.current_state, 7)
+        expected = REFERENCE[(2, 7)]
+        self.assertEqual((counts.p1_wins, counts.p2_wins),
+                         (expected.p2_wins, expected.p1_wins))
+
+
+if __name__ == "__main__":
+    unittest.main()
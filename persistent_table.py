@@ -0,0 +1,234 @@
+"""
+A transposition table kept in a memory-mapped file, so that solved positions
+survive restarts and are shared by every process that maps the same file.
+
+The file is an open-addressing hash table of fixed-size slots, indexed by
+the states' 64-bit Zobrist hashes. Each slot holds the entry's data and its
+key XOR-ed with that data; a reader only accepts a slot whose two words
+agree with the key it looks for. Slots are written without locks, so a
+write torn by a concurrent writer or a crash reads as a miss rather than a
+wrong entry. As with any Zobrist-hashed table, two positions sharing a
+64-bit hash are indistinguishable.
+"""
+import mmap
+import os
+import struct
+import tempfile
+from typing import Any, List, Tuple, Union
+from strategy import state_score_r
+
+# File header: magic, format version, number of slots (a power of two)
+MAGIC = b'SHPC'
+VERSION = 1
+HEADER = struct.Struct('<4sIQ')
+HEADER_SIZE = 64
+SLOT = struct.Struct('<QQ')
+# Slots examined for a key before giving up, or replacing the shallowest
+PROBES = 8
+# Depth recorded for scores found by searching to the end of the game
+FULL_DEPTH = 0xFFFF
+# Set in the data of every written slot, so empty slots never match
+VALID = 1 << 40
+
+
+def pack_entry(score: int, depth: int, move: int) -> int:
+    """
+    Return score, depth and move (an index into the state's possible moves,
+    or -1 for none) packed into one 64-bit word. depth must be at most
+    0xFFFF, and move less than that.
+
+    >>> unpack_entry(pack_entry(-1, 7, -1))
+    (-1, 7, -1)
+    >>> pack_entry(1, 0x10000, -1)
+    Traceback (most recent call last):
+    ...
+    ValueError: depth and move must fit in 16 bits
+    """
+    if not 0 <= depth <= 0xFFFF or not -1 <= move < 0xFFFF:
+        raise ValueError('depth and move must fit in 16 bits')
+    return (score & 0xFF) | depth << 8 | (move + 1) << 24 | VALID
+
+
+def unpack_entry(data: int) -> Tuple[int, int, int]:
+    """
+    Return the score, depth and move packed into data by pack_entry.
+    """
+    score = data & 0xFF
+    return (score - 256 if score > 127 else score, data >> 8 & 0xFFFF,
+            (data >> 24 & 0xFFFF) - 1)
+
+
+def _create(path: str, num_slots: int) -> None:
+    """
+    Create an empty table file with num_slots slots at path, unless one
+    already exists there. The file is built under a temporary name and
+    linked into place, so no process ever maps a partly written file, and a
+    file created meanwhile by another process is left as it is.
+    """
+    handle, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, num_slots).ljust(
+                HEADER_SIZE, b'\0'))
+            file.truncate(HEADER_SIZE + num_slots * SLOT.size)
+        try:
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+    finally:
+        os.unlink(temp_path)
+
+
+class PersistentTable:
+    """
+    A transposition table stored in a memory-mapped file. It has the get and
+    put methods of TranspositionTable, so it can be passed to the minimax
+    functions in place of one.
+
+    path - the file backing this table
+    num_slots - number of slots in the file
+    hits - number of lookups that found an entry
+    misses - number of lookups that found nothing
+    """
+    path: str
+    num_slots: int
+    hits: int
+    misses: int
+
+    def __init__(self, path: str, num_slots: int = 1 << 20) -> None:
+        """
+        Open the table stored at path, creating it with num_slots slots
+        (rounded up to a power of two) if it does not exist yet. An existing
+        file keeps its own number of slots.
+        """
+        if not os.path.exists(path):
+            _create(path, 1 << max(num_slots - 1, 1).bit_length())
+        self.path = path
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, version, self.num_slots = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION or \
+                len(self._map) != HEADER_SIZE + self.num_slots * SLOT.size:
+            self.close()
+            raise ValueError('{} is not a position cache file'.format(path))
+        self.hits = 0
+        self.misses = 0
+
+    def _offsets(self, key: int) -> List[int]:
+        """
+        Return the byte offsets in the file of the slots that may hold key.
+        """
+        mask = self.num_slots - 1
+        return [HEADER_SIZE + ((key + i) & mask) * SLOT.size
+                for i in range(PROBES)]
+
+    def probe(self, state: Any) -> Union[Tuple[int, int, Any], None]:
+        """
+        Return the score, depth and best move (or None) stored for state, or
+        None if there is no entry for it.
+        """
+        key = state.zobrist
+        for offset in self._offsets(key):
+            check, data = SLOT.unpack_from(self._map, offset)
+            if data & VALID and check ^ data == key:
+                self.hits += 1
+                score, depth, move = unpack_entry(data)
+                return score, depth, (None if move < 0 else
+                                      state.get_possible_moves()[move])
+        self.misses += 1
+        return None
+
+    def store(self, state: Any, score: int, depth: int = FULL_DEPTH,
+              move: Any = None) -> None:
+        """
+        Store score, the depth it was searched to and the best move (if
+        known) for state. The entry replaces any entry for state, keeping
+        its best move if move is None, else an empty slot, else the entry
+        with the smallest depth among the slots probed, unless that is
+        deeper than depth.
+        """
+        key = state.zobrist
+        index = -1 if move is None else \
+            state.get_possible_moves().index(move)
+        target, target_depth = None, depth + 1
+        for offset in self._offsets(key):
+            check, data = SLOT.unpack_from(self._map, offset)
+            if not data & VALID:
+                target = offset
+                break
+            if check ^ data == key:
+                if index == -1:
+                    index = unpack_entry(data)[2]
+                target = offset
+                break
+            if unpack_entry(data)[1] < target_depth:
+                target, target_depth = offset, unpack_entry(data)[1]
+        if target is not None:
+            data = pack_entry(score, depth, index)
+            SLOT.pack_into(self._map, target, key ^ data, data)
+
+    def get(self, state: Any) -> Union[int, None]:
+        """
+        Return the score stored for state, or None if there is none or it was
+        not found by searching to the end of the game.
+        """
+        entry = self.probe(state)
+        return None if entry is None or entry[1] != FULL_DEPTH else entry[0]
+
+    def put(self, state: Any, score: int) -> None:
+        """
+        Store score, found by searching to the end of the game, for state.
+        """
+        self.store(state, score)
+
+    def flush(self) -> None:
+        """
+        Write changes to this table through to its file.
+        """
+        self._map.flush()
+
+    def close(self) -> None:
+        """
+        Flush and close this table.
+        """
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> 'PersistentTable':
+        """
+        Return this table, for use in a with statement.
+        """
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """
+        Close this table at the end of a with statement.
+        """
+        self.close()
+
+
+def persistent_minimax_strategy(game: Any, table: PersistentTable) -> Any:
+    """
+    Return a move for game that leads to a win, if a win is possible, the
+    same move as recursive_minimax_strategy. Positions are solved with
+    recursive minimax using table, and the move chosen is stored there too,
+    so a position already solved by any process sharing table is answered
+    without search.
+    """
+    state = game.current_state
+    entry = table.probe(state)
+    if entry is not None and entry[1] == FULL_DEPTH and entry[2] is not None:
+        return entry[2]
+    moves = state.get_possible_moves()
+    scores = [-state_score_r(game, state.make_move(m), table) for m in moves]
+    best = scores.index(max(scores))
+    table.store(state, scores[best], FULL_DEPTH, moves[best])
+    return moves[best]
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,156 @@
+"""
+Unittests for the memory-mapped persistent position cache.
+"""
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+
+from persistent_table import PersistentTable, persistent_minimax_strategy
+from stonehenge import StonehengeGame, StonehengeState
+from strategy import recursive_minimax_strategy, state_score_r
+
+
+def probe_in_process(path: str, moves: list) -> tuple:
+    """
+    Return the entry found in the table at path for the state reached by
+    moves from a new board of size 2, looked up from another process.
+    """
+    state = StonehengeState(True, 2)
+    for move in moves:
+        state = state.make_move(move)
+    with PersistentTable(path) as table:
+        return table.probe(state)
+
+
+def open_together(path: str, barrier: object, move: str) -> int:
+    """
+    Open the table at path as soon as every process has reached barrier,
+    store a score for the board of size 2 where move is the first move, and
+    return the number of slots the table has.
+    """
+    barrier.wait()
+    with PersistentTable(path, 64) as table:
+        table.put(StonehengeState(True, 2).make_move(move), 1)
+        return table.num_slots
+
+
+class PersistentTableUnitTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'positions.cache')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_store_and_probe(self):
+        """
+        Test that stored entries are found again, and other states are not.
+        """
+        state = StonehengeState(True, 2).make_move('A')
+        with PersistentTable(self.path, 64) as table:
+            self.assertIsNone(table.probe(state))
+            table.store(state, -1, 3, 'C')
+            self.assertEqual(table.probe(state), (-1, 3, 'C'))
+            self.assertIsNone(table.get(state.make_move('B')))
+            table.put(state, 1)
+            self.assertEqual(table.get(state), 1)
+            self.assertEqual(table.probe(state), (1, 0xFFFF, 'C'))
+            self.assertEqual((table.hits, table.misses), (3, 2))
+
+    def test_get_ignores_shallow_entries(self):
+        """
+        Test that a score stored with less than the full depth is not
+        returned by get, so state_score_r does not take it as exact.
+        """
+        game = StonehengeGame(True, 2)
+        state = StonehengeState(True, 2).make_move('A').make_move('G')
+        expected = state_score_r(game, state)
+        with PersistentTable(self.path, 64) as table:
+            table.store(state, -expected, 3)
+            self.assertIsNone(table.get(state))
+            self.assertEqual(state_score_r(game, state, table), expected)
+            self.assertEqual(table.get(state), expected)
+
+    def test_strategy_ignores_shallow_moves(self):
+        """
+        Test that the strategy solves a position whose stored best move was
+        not found by searching to the end of the game.
+        """
+        game = StonehengeGame(True, 2)
+        for move in ['A', 'F', 'D']:
+            game.current_state = game.current_state.make_move(move)
+        expected = recursive_minimax_strategy(game)
+        wrong = [move for move in game.current_state.get_possible_moves()
+                 if move != expected][0]
+        with PersistentTable(self.path, 64) as table:
+            table.store(game.current_state, 1, 3, wrong)
+            self.assertEqual(persistent_minimax_strategy(game, table),
+                             expected)
+
+    def test_created_by_several_processes_at_once(self):
+        """
+        Test that processes opening a new path together all map the same
+        complete file, and none of them truncates entries another stored.
+        """
+        moves = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
+        with Manager() as manager, ProcessPoolExecutor(len(moves)) as executor:
+            for attempt in range(5):
+                path = '{}.{}'.format(self.path, attempt)
+                barrier = manager.Barrier(len(moves))
+                slots = list(executor.map(open_together, [path] * len(moves),
+                                          [barrier] * len(moves), moves))
+                self.assertEqual(slots, [64] * len(moves))
+                with PersistentTable(path) as table:
+                    for move in moves:
+                        self.assertEqual(table.get(StonehengeState(
+                            True, 2).make_move(move)), 1)
+        # No temporary files are left behind.
+        self.assertEqual(len(os.listdir(self.directory.name)), 5)
+
+    def test_survives_reopening(self):
+        """
+        Test that entries are still there after the table is closed and
+        opened again, with the number of slots it was created with.
+        """
+        state = StonehengeState(False, 3).make_move('L')
+        with PersistentTable(self.path, 100) as table:
+            table.put(state, 1)
+        with PersistentTable(self.path, 8) as table:
+            self.assertEqual(table.num_slots, 128)
+            self.assertEqual(table.probe(state), (1, 0xFFFF, None))
+
+    def test_shared_between_processes(self):
+        """
+        Test that an entry stored by one process is read by another while
+        the first still has the table open.
+        """
+        state = StonehengeState(True, 2).make_move('A').make_move('G')
+        with PersistentTable(self.path) as table:
+            table.store(state, 1, 2, 'D')
+            with ProcessPoolExecutor(1) as executor:
+                entry = executor.submit(probe_in_process, self.path,
+                                        ['A', 'G']).result()
+        self.assertEqual(entry, (1, 2, 'D'))
+
+    def test_strategy_same_move_as_minimax(self):
+        """
+        Test that the strategy chooses the move recursive minimax chooses,
+        both when solving and when answering from the cache.
+        """
+        game = StonehengeGame(True, 2)
+        for move in ['A', 'F', 'D']:
+            game.current_state = game.current_state.make_move(move)
+        expected = recursive_minimax_strategy(game)
+        with PersistentTable(self.path) as table:
+            self.assertEqual(persistent_minimax_strategy(game, table),
+                             expected)
+        with PersistentTable(self.path) as table:
+            self.assertEqual(persistent_minimax_strategy(game, table),
+                             expected)
+            self.assertEqual(table.misses, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Unittests for StonehengeState.rough_outcome, checked against a version that
+makes every move of the next two plies, as rough_outcome used to.
+"""
+import random
+import unittest
+
+from stonehenge import StonehengeState, is_winner
+
+
+def two_ply_rough_outcome(state: StonehengeState) -> float:
+    """
+    Return rough_outcome of state, found by building every state up to two
+    moves ahead.
+    """
+    current = 1 if state.p1_turn else 2
+    opponent = 3 - current
+    states = [state.make_move(x) for x in state.get_possible_moves()]
+    if any(is_winner(x, current) for x in states):
+        return state.WIN
+    if all(any(is_winner(x.make_move(y), opponent)
+               for y in x.get_possible_moves()) for x in states):
+        return state.LOSE
+    own = state.p1_captured if current == 1 else state.p2_captured
+    opp = state.p2_captured if current == 1 else state.p1_captured
+    if own == opp:
+        return state.DRAW
+    return (own - opp) / (len(state.topology.lines) / 2)
+
+
+class RoughOutcomeUnitTests(unittest.TestCase):
+    def test_matches_two_ply_search(self):
+        """
+        Test rough_outcome on every state of random games on boards of sizes
+        1 to 5, including states where the game is over.
+        """
+        rng = random.Random(0)
+        outcomes = set()
+        for _ in range(150):
+            state = StonehengeState(rng.random() < 0.5, rng.randint(1, 5))
+            while True:
+                expected = two_ply_rough_outcome(state)
+                self.assertEqual(state.rough_outcome(), expected, repr(state))
+                outcomes.add(expected)
+                moves = state.get_possible_moves()
+                if not moves:
+                    break
+                state = state.make_move(rng.choice(moves))
+        self.assertTrue({StonehengeState.WIN, StonehengeState.LOSE,
+                         StonehengeState.DRAW} <= outcomes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+"""
+Statistics on the work done by a search, for the strategies in strategy.py.
+
+A strategy given a SearchStats fills it in as it searches; given None, as
+by default, it skips all of the bookkeeping.
+"""
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, Union
+
+
+class SearchStats:
+    """
+    Counters and timings collected during one or more searches.
+
+    nodes - number of states visited
+    expanded - number of states whose moves were generated and searched
+    children - number of child states generated by those expansions
+    terminal - number of visited states where the game is over
+    max_depth - greatest number of moves from the searched position to a
+                visited state
+    cache_hits - number of table lookups that found an entry
+    cache_misses - number of table lookups that found nothing
+    playouts - number of random playouts, for searches that make them
+    phase_times - seconds spent in each named phase of the search
+    """
+    nodes: int
+    expanded: int
+    children: int
+    terminal: int
+    max_depth: int
+    cache_hits: int
+    cache_misses: int
+    playouts: int
+    phase_times: Dict[str, float]
+
+    def __init__(self) -> None:
+        """
+        Create a SearchStats with every counter at zero.
+
+        >>> stats = SearchStats()
+        >>> stats.nodes, stats.max_depth, stats.phase_times
+        (0, 0, {})
+        """
+        self.nodes = 0
+        self.expanded = 0
+        self.children = 0
+        self.terminal = 0
+        self.max_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.playouts = 0
+        self.phase_times = {}
+
+    def visit(self, depth: int) -> None:
+        """
+        Record a visit to a state depth moves from the searched position.
+        """
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def expand(self, num_children: int) -> None:
+        """
+        Record the expansion of a state into num_children child states.
+        """
+        self.expanded += 1
+        self.children += num_children
+
+    def lookup(self, found: bool) -> None:
+        """
+        Record a table lookup, which found an entry if found is True.
+        """
+        if found:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    def merge(self, other: 'SearchStats') -> None:
+        """
+        Add the counts and phase times of other, such as the statistics of a
+        search run in another process, to these statistics.
+
+        >>> stats, other = SearchStats(), SearchStats()
+        >>> stats.nodes, other.nodes, other.max_depth = 2, 3, 4
+        >>> stats.merge(other)
+        >>> stats.nodes, stats.max_depth
+        (5, 4)
+        """
+        self.nodes += other.nodes
+        self.expanded += other.expanded
+        self.children += other.children
+        self.terminal += other.terminal
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        self.playouts += other.playouts
+        for name, seconds in other.phase_times.items():
+            self.phase_times[name] = self.phase_times.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Return a context manager that adds the wall time spent inside it to
+        the phase called name.
+
+        >>> stats = SearchStats()
+        >>> with stats.phase('search'):
+        ...     pass
+        >>> list(stats.phase_times)
+        ['search']
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_times[name] = self.phase_times.get(name, 0.0) + \
+                time.perf_counter() - start
+
+    @property
+    def cache_hit_rate(self) -> float:
+        """
+        Return the fraction of table lookups that found an entry, or 0.0 if
+        there were none.
+        """
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+    @property
+    def mean_branching(self) -> float:
+        """
+        Return the mean number of children of the expanded states.
+        """
+        return self.children / self.expanded if self.expanded else 0.0
+
+    @property
+    def effective_branching(self) -> float:
+        """
+        Return the effective branching factor of the search: the branching
+        factor b of a uniform tree of depth max_depth with as many nodes,
+        so that nodes = 1 + b + b ** 2 + ... + b ** max_depth.
+
+        >>> stats = SearchStats()
+        >>> stats.nodes, stats.max_depth = 7, 2
+        >>> round(stats.effective_branching, 6)
+        2.0
+        """
+        if self.max_depth == 0 or self.nodes <= self.max_depth + 1:
+            return 1.0 if self.max_depth else 0.0
+        low, high = 1.0, float(self.nodes)
+        for _ in range(60):
+            middle = (low + high) / 2
+            total = sum(middle ** i for i in range(self.max_depth + 1))
+            if total < self.nodes:
+                low = middle
+            else:
+                high = middle
+        return (low + high) / 2
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return these statistics, derived ones included, as a dict of plain
+        values.
+        """
+        return {'nodes': self.nodes, 'expanded': self.expanded,
+                'children': self.children, 'terminal': self.terminal,
+                'max_depth': self.max_depth, 'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'cache_hit_rate': self.cache_hit_rate,
+                'playouts': self.playouts,
+                'mean_branching': self.mean_branching,
+                'effective_branching': self.effective_branching,
+                'phase_times': dict(self.phase_times)}
+
+    def to_json(self, indent: Union[int, None] = None) -> str:
+        """
+        Return these statistics as a JSON object.
+
+        >>> import json
+        >>> json.loads(SearchStats().to_json())['nodes']
+        0
+        """
+        return json.dumps(self.to_dict(), indent=indent)
+
+
+def phase(stats: Union[SearchStats, None], name: str) -> Any:
+    """
+    Return stats.phase(name), or a context manager that does nothing if
+    stats is None.
+    """
+    return nullcontext() if stats is None else stats.phase(name)
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -1,9 +1,10 @@
 """
 Game and GameState classes and helper functions for the game Stonehenge.
 """
-from typing import List, Dict
+import random
+from typing import Any, List, Dict, NamedTuple, Tuple, Union
 from game import Game
-from game_state import GameState
+from game_state import GameState, zobrist_keys
 
 
 def create_ley_dl(board_size: int) -> List[List[int]]:
@@ -133,6 +134,131 @@ def create_cells(rows: List[List[str]],
     return [[x if state[x] == 0 else str(state[x]) for x in l] for l in rows]
 
 
+def create_symmetries(board_size: int, lines: Tuple[Tuple[int, ...], ...]) \
+        -> Tuple[Tuple[Tuple[int, ...], Tuple[int, ...]], ...]:
+    """
+    Return the rotations and reflections of a Stonehenge board of size
+    board_size with ley-lines lines, the identity first. Each is a pair of
+    tuples giving the cell that each cell is mapped to and the ley-line that
+    each ley-line is mapped to.
+
+    The board is a triangle of side board_size + 2 with its corners removed,
+    so its symmetries are those of the triangle: they permute the three
+    barycentric coordinates of the cells.
+
+    >>> symmetries = create_symmetries(1, topology(1).lines)
+    >>> len(symmetries)
+    6
+    >>> symmetries[0]
+    ((0, 1, 2), (0, 1, 2, 3, 4, 5))
+    >>> symmetries[1]
+    ((1, 0, 2), (2, 3, 0, 1, 4, 5))
+    """
+    # Barycentric coordinates (a, b, c) of each cell, where a is constant
+    # along rows, b along down-right diagonals and c along down-left ones.
+    coordinates = []
+    for r, row in enumerate(create_ley_row(board_size)):
+        for k in range(len(row)):
+            t, j = r + 1, k if r < board_size else k + 1
+            coordinates.append((board_size + 1 - t, t - j, j))
+    cell_at = {coordinate: i for i, coordinate in enumerate(coordinates)}
+    line_at = {frozenset(line): i for i, line in enumerate(lines)}
+    symmetries = []
+    for order in [(0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1),
+                  (2, 1, 0)]:
+        cells = tuple(cell_at[tuple(coordinate[x] for x in order)]
+                      for coordinate in coordinates)
+        symmetries.append((cells, tuple(
+            line_at[frozenset(cells[i] for i in line)] for line in lines)))
+    return tuple(symmetries)
+
+
+class LeyTopology(NamedTuple):
+    """
+    The geometry of a Stonehenge board of one size, shared by every state of
+    that size. Cells are numbered in reading order and ley-lines are ordered
+    down-left diagonals, down-right diagonals, then rows. Obtain one through
+    topology() rather than building it directly.
+
+    board_size - length of the board's sides
+    cells - names of the cells, indexed by cell number
+    lines - cell numbers on each ley-line
+    masks - bitmask of the cells on each ley-line
+    lengths - number of cells on each ley-line
+    thresholds - cells a player must claim to capture each ley-line
+    cell_lines - numbers of the ley-lines through each cell
+    lines_to_win - ley-lines a player must capture to win
+    cell_keys - Zobrist keys for each cell claimed by player 1, then 2
+    line_keys - Zobrist keys for each ley-line captured by player 1, then 2
+    empty_key - Zobrist hash of an empty board with player 2 to move
+    turn_key - Zobrist key toggled when player 1 is to move
+    symmetries - for each rotation and reflection of the board, the cell and
+                 the ley-line that each cell and ley-line is mapped to
+    """
+    board_size: int
+    cells: Tuple[str, ...]
+    lines: Tuple[Tuple[int, ...], ...]
+    masks: Tuple[int, ...]
+    lengths: Tuple[int, ...]
+    thresholds: Tuple[int, ...]
+    cell_lines: Tuple[Tuple[int, ...], ...]
+    lines_to_win: int
+    cell_keys: Tuple[Tuple[int, ...], Tuple[int, ...]]
+    line_keys: Tuple[Tuple[int, ...], Tuple[int, ...]]
+    empty_key: int
+    turn_key: int
+    symmetries: Tuple[Tuple[Tuple[int, ...], Tuple[int, ...]], ...]
+
+
+def topology(board_size: int) -> LeyTopology:
+    """
+    Return the LeyTopology of a Stonehenge board of size board_size. It is
+    built the first time a size is requested and shared afterwards.
+
+    >>> topo = topology(1)
+    >>> topo.lines
+    ((0,), (1, 2), (1,), (0, 2), (0, 1), (2,))
+    >>> topo.masks
+    (1, 6, 2, 5, 3, 4)
+    >>> topo.thresholds
+    (1, 1, 1, 1, 1, 1)
+    >>> topo.cell_lines
+    ((0, 3, 4), (1, 2, 4), (1, 3, 5))
+    >>> topology(1) is topo
+    True
+    """
+    if board_size not in _TOPOLOGIES:
+        lines = tuple(tuple(list_) for index in (create_ley_dl(board_size),
+                                                 create_ley_dr(board_size),
+                                                 create_ley_row(board_size))
+                      for list_ in index)
+        num_cells = sum(range(3, 3 + board_size))
+        keys = zobrist_keys(2 * num_cells + 2 * len(lines) + 2, board_size)
+        cell_keys = keys[:2 * num_cells]
+        line_keys = keys[2 * num_cells:-2]
+        _TOPOLOGIES[board_size] = LeyTopology(
+            board_size=board_size,
+            cells=tuple(StonehengeState.CELLS[:num_cells]),
+            lines=lines,
+            masks=tuple(sum(1 << i for i in line) for line in lines),
+            lengths=tuple(len(line) for line in lines),
+            thresholds=tuple((len(line) + 1) // 2 for line in lines),
+            cell_lines=tuple(tuple(j for j, line in enumerate(lines)
+                                   if i in line) for i in range(num_cells)),
+            lines_to_win=(len(lines) + 1) // 2,
+            cell_keys=(tuple(cell_keys[:num_cells]),
+                       tuple(cell_keys[num_cells:])),
+            line_keys=(tuple(line_keys[:len(lines)]),
+                       tuple(line_keys[len(lines):])),
+            empty_key=keys[-2],
+            turn_key=keys[-1],
+            symmetries=create_symmetries(board_size, lines))
+    return _TOPOLOGIES[board_size]
+
+
+_TOPOLOGIES: Dict[int, LeyTopology] = {}
+
+
 def is_winner(state: 'StonehengeState', player: int) -> bool:
     """
     Return true if and only if player, 1 or 2, would have won a
@@ -145,27 +271,36 @@ def is_winner(state: 'StonehengeState', player: int) -> bool:
     >>> is_winner(StonehengeState(True, 1).make_move('A'), 2)
     False
     """
-    lines = sum([state.mark_dl, state.mark_dr, state.mark_row], [])
-    num = sum([1 for x in lines if x == str(player)])
-    return num / len(lines) >= 0.5
+    captured = state.p1_captured if player == 1 else state.p2_captured
+    return captured >= state.topology.lines_to_win
 
 
 class StonehengeState(GameState):
     """
     The state of the game Stonehenge at a specific point.
 
-    ley - ley-lines along the down-left diagonals, down-right diagonals, and
-          horizontal rows
-    mark_dl - markers for down-left ley-lines
-    mark_dr - markers for down-right ley-lines
-    mark_row - markers for horizontal ley-lines
-    cell_state - current state of cells on board
+    Cells and ley-lines are numbered as in the state's LeyTopology, and
+    ownership is kept as bitmasks over those numbers.
+
+    topology - the geometry of the board, shared by all states of its size
+    p1_cells - bitmask of cells claimed by player 1
+    p2_cells - bitmask of cells claimed by player 2
+    p1_lines - bitmask of ley-lines captured by player 1
+    p2_lines - bitmask of ley-lines captured by player 2
+    p1_captured - number of ley-lines captured by player 1
+    p2_captured - number of ley-lines captured by player 2
     """
-    ley: List[List[List[str]]]
-    mark_dl: List[str]
-    mark_dr: List[str]
-    mark_row: List[str]
-    cell_state: Dict[str, int]
+    topology: LeyTopology
+    p1_cells: int
+    p2_cells: int
+    p1_lines: int
+    p2_lines: int
+    p1_captured: int
+    p2_captured: int
+    # States never change once made, so these are computed on first use by
+    # winner and legal_moves and then kept on the state.
+    _winner: Union[int, None] = None
+    _moves: Union[Tuple[str, ...], None] = None
 
     CELLS = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M',
              'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z']
@@ -185,26 +320,91 @@ class StonehengeState(GameState):
         >>> state.cell_state
         {'A': 0, 'B': 0, 'C': 0}
         """
-        self.p1_turn = is_p1_turn
-        # Create cells on board
-        num_cells = sum(range(3, 3 + board_size))
-        used_cells = StonehengeState.CELLS[:num_cells]
-        self.cell_state = {x: 0 for x in used_cells}
-        # Create ley-lines
-        ley_dl, ley_dr, ley_row = [], [], []
-        index_dl = create_ley_dl(board_size)
-        index_dr = create_ley_dr(board_size)
-        index_row = create_ley_row(board_size)
-        for list_ in index_dl:
-            ley_dl.append([StonehengeState.CELLS[x] for x in list_])
-        for list_ in index_dr:
-            ley_dr.append([StonehengeState.CELLS[x] for x in list_])
-        for list_ in index_row:
-            ley_row.append([StonehengeState.CELLS[x] for x in list_])
-        self.ley = [ley_dl, ley_dr, ley_row]
-        self.mark_dl = create_markers(ley_dl, self.cell_state)
-        self.mark_dr = create_markers(ley_dr, self.cell_state)
-        self.mark_row = create_markers(ley_row, self.cell_state)
+        super().__init__(is_p1_turn)
+        self.topology = topology(board_size)
+        self.p1_cells, self.p2_cells = 0, 0
+        self.p1_lines, self.p2_lines = 0, 0
+        self.p1_captured, self.p2_captured = 0, 0
+        self.zobrist = self.topology.empty_key
+        if is_p1_turn:
+            self.zobrist ^= self.topology.turn_key
+
+    @property
+    def board_size(self) -> int:
+        """
+        Return the length of the board's sides.
+
+        >>> StonehengeState(True, 2).board_size
+        2
+        """
+        return self.topology.board_size
+
+    @property
+    def num_cells(self) -> int:
+        """
+        Return the number of cells on the board.
+
+        >>> StonehengeState(True, 2).num_cells
+        7
+        """
+        return len(self.topology.cells)
+
+    @property
+    def cell_state(self) -> Dict[str, int]:
+        """
+        Return the current state of cells on the board: 0 for an unclaimed
+        cell, otherwise the player who claimed it.
+
+        >>> StonehengeState(True, 1).make_move('B').cell_state
+        {'A': 0, 'B': 1, 'C': 0}
+        """
+        return {cell: 1 if self.p1_cells >> i & 1 else
+                2 if self.p2_cells >> i & 1 else 0
+                for i, cell in enumerate(self.topology.cells)}
+
+    @property
+    def ley(self) -> List[List[List[str]]]:
+        """
+        Return the ley-lines along the down-left diagonals, down-right
+        diagonals, and horizontal rows as lists of cell names.
+
+        >>> StonehengeState(True, 1).ley[2]
+        [['A', 'B'], ['C']]
+        """
+        cells, lines = self.topology.cells, self.topology.lines
+        size = self.board_size + 1
+        return [[[cells[x] for x in line] for line in lines[i:i + size]]
+                for i in range(0, 3 * size, size)]
+
+    def _markers(self, first: int) -> List[str]:
+        """
+        Return the markers of the board_size + 1 ley-lines starting at line
+        index first.
+        """
+        return ['1' if self.p1_lines >> i & 1 else
+                '2' if self.p2_lines >> i & 1 else '@'
+                for i in range(first, first + self.board_size + 1)]
+
+    @property
+    def mark_dl(self) -> List[str]:
+        """
+        Return the markers for down-left ley-lines.
+        """
+        return self._markers(0)
+
+    @property
+    def mark_dr(self) -> List[str]:
+        """
+        Return the markers for down-right ley-lines.
+        """
+        return self._markers(self.board_size + 1)
+
+    @property
+    def mark_row(self) -> List[str]:
+        """
+        Return the markers for horizontal ley-lines.
+        """
+        return self._markers(2 * (self.board_size + 1))
 
     def __str__(self) -> str:
         """
@@ -246,21 +446,141 @@ class StonehengeState(GameState):
 
     def get_possible_moves(self) -> List[str]:
         """
-        Return all possible moves that can be applied to this state. Overrides
-        GameState.get_possible_moves
+        Return all possible moves that can be applied to this state, as a new
+        list that the caller may change. Overrides GameState.get_possible_moves
 
         >>> StonehengeState(True, 1).get_possible_moves()
         ['A', 'B', 'C']
         >>> StonehengeState(True, 3).get_possible_moves()
         ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L']
         """
-        if not is_winner(self, 1) and not is_winner(self, 2):
-            moves = []
-            for key in self.cell_state:
-                if self.cell_state[key] == 0:
-                    moves.append(key)
-            return moves
-        return []
+        if self._moves is not None:
+            return list(self._moves)
+        if self.winner:
+            return []
+        taken = self.p1_cells | self.p2_cells
+        return [cell for i, cell in enumerate(self.topology.cells)
+                if not taken >> i & 1]
+
+    def legal_moves(self) -> Tuple[str, ...]:
+        """
+        Return the possible moves of this state, as get_possible_moves does,
+        but as a tuple that is computed once and then shared by every call.
+
+        >>> state = StonehengeState(True, 1).make_move('B')
+        >>> state.legal_moves()
+        ()
+        >>> state.legal_moves() is state.legal_moves()
+        True
+        """
+        if self._moves is None:
+            self._moves = tuple(self.get_possible_moves())
+        return self._moves
+
+    @property
+    def winner(self) -> int:
+        """
+        Return the player, 1 or 2, who has won the game at this state, or 0
+        if the game is not over yet. Computed once per state.
+
+        >>> StonehengeState(True, 1).winner
+        0
+        >>> StonehengeState(False, 1).make_move('C').winner
+        2
+        """
+        if self._winner is None:
+            lines_to_win = self.topology.lines_to_win
+            self._winner = 1 if self.p1_captured >= lines_to_win else \
+                2 if self.p2_captured >= lines_to_win else 0
+        return self._winner
+
+    def is_valid_move(self, move: Any) -> bool:
+        """
+        Return whether move is a possible move at this state. Overrides
+        GameState.is_valid_move
+
+        >>> state = StonehengeState(True, 2).make_move('A')
+        >>> state.is_valid_move('B'), state.is_valid_move('A')
+        (True, False)
+        >>> state.is_valid_move(None)
+        False
+        """
+        return move in self.legal_moves()
+
+    def get_ordered_moves(self) -> List[str]:
+        """
+        Return all possible moves that can be applied to this state, with
+        moves that capture ley-lines first and moves that stop the opponent
+        capturing ley-lines next. Overrides GameState.get_ordered_moves
+
+        >>> state = StonehengeState(True, 2).make_move('D').make_move('A')
+        >>> state.get_ordered_moves()
+        ['E', 'F', 'G', 'B', 'C']
+        """
+        topo = self.topology
+        if self.p1_turn:
+            own, opp = self.p1_cells, self.p2_cells
+        else:
+            own, opp = self.p2_cells, self.p1_cells
+        taken = self.p1_lines | self.p2_lines
+
+        def priority(move: str) -> int:
+            """
+            Return how many ley-lines move captures, weighted double, plus
+            how many ley-lines it keeps the opponent from capturing next.
+            """
+            total = 0
+            for i in topo.cell_lines[CELL_INDEX[move]]:
+                if not taken >> i & 1:
+                    if (own & topo.masks[i]).bit_count() + 1 >= \
+                            topo.thresholds[i]:
+                        total += 2
+                    elif (opp & topo.masks[i]).bit_count() + 1 >= \
+                            topo.thresholds[i]:
+                        total += 1
+            return total
+        return sorted(self.get_possible_moves(), key=priority, reverse=True)
+
+    def playout(self, rng: random.Random) -> 'StonehengeState':
+        """
+        Return the state reached by making moves chosen uniformly at random
+        with rng, starting from this state, until no moves are left. The
+        moves are played on bitmasks, without building intermediate states.
+        Overrides GameState.playout
+
+        >>> final = StonehengeState(True, 2).playout(random.Random(0))
+        >>> is_winner(final, 1) != is_winner(final, 2)
+        True
+        """
+        topo = self.topology
+        cells = [self.p1_cells, self.p2_cells]
+        lines = [self.p1_lines, self.p2_lines]
+        captured = [self.p1_captured, self.p2_captured]
+        zobrist = self.zobrist
+        player = 0 if self.p1_turn else 1
+        taken = cells[0] | cells[1]
+        # Claiming the free cells in a random order is a uniformly random
+        # sequence of moves.
+        free = [i for i in range(len(topo.cells)) if not taken >> i & 1]
+        rng.shuffle(free)
+        for index in free:
+            if captured[0] >= topo.lines_to_win or \
+                    captured[1] >= topo.lines_to_win:
+                break
+            cells[player] |= 1 << index
+            zobrist ^= topo.turn_key ^ topo.cell_keys[player][index]
+            for i in topo.cell_lines[index]:
+                if not (lines[0] | lines[1]) >> i & 1 and \
+                        (cells[player] & topo.masks[i]).bit_count() >= \
+                        topo.thresholds[i]:
+                    lines[player] |= 1 << i
+                    captured[player] += 1
+                    zobrist ^= topo.line_keys[player][i]
+            player = 1 - player
+        final = StonehengeState.__new__(StonehengeState)
+        final.__setstate__((player == 0, topo.board_size, cells[0], cells[1],
+                            lines[0], lines[1], zobrist))
+        return final
 
     def make_move(self, move: str) -> 'StonehengeState':
         """
@@ -284,22 +604,106 @@ class StonehengeState(GameState):
         >>> state1.p1_turn
         True
         """
-        new_state = StonehengeState(not self.p1_turn, len(self.mark_dl) - 1)
-        new_state.cell_state = self.cell_state.copy()
-        new_state.cell_state[move] = 1 if self.p1_turn else 2
-        old_dl, old_dr, old_row = self.mark_dl.copy(), self.mark_dr.copy(),\
-            self.mark_row.copy()
-        new_dl = create_markers(self.ley[0], new_state.cell_state)
-        new_dr = create_markers(self.ley[1], new_state.cell_state)
-        new_row = create_markers(self.ley[2], new_state.cell_state)
-        new_state.mark_dl = [old_dl[i] if old_dl[i] != '@' else new_dl[i] for
-                             i in range(len(old_dl))]
-        new_state.mark_dr = [old_dr[i] if old_dr[i] != '@' else new_dr[i] for
-                             i in range(len(old_dr))]
-        new_state.mark_row = [old_row[i] if old_row[i] != '@' else new_row[i]
-                              for i in range(len(old_row))]
+        topo = self.topology
+        index = CELL_INDEX[move]
+        player = 0 if self.p1_turn else 1
+        new_state = StonehengeState.__new__(StonehengeState)
+        new_state.p1_turn = not self.p1_turn
+        new_state.topology = topo
+        new_state.p1_cells, new_state.p2_cells = self.p1_cells, self.p2_cells
+        new_state.p1_lines, new_state.p2_lines = self.p1_lines, self.p2_lines
+        new_state.p1_captured = self.p1_captured
+        new_state.p2_captured = self.p2_captured
+        new_state.zobrist = self.zobrist ^ topo.turn_key ^ \
+            topo.cell_keys[player][index]
+        if self.p1_turn:
+            new_state.p1_cells |= 1 << index
+            cells, lines = new_state.p1_cells, new_state.p1_lines
+        else:
+            new_state.p2_cells |= 1 << index
+            cells, lines = new_state.p2_cells, new_state.p2_lines
+        # A ley-line is captured, permanently, by the first player to claim
+        # at least half of its cells. Only the (at most three) ley-lines
+        # through the claimed cell can change.
+        taken = self.p1_lines | self.p2_lines
+        for i in topo.cell_lines[index]:
+            if not taken >> i & 1 and \
+                    (cells & topo.masks[i]).bit_count() >= topo.thresholds[i]:
+                lines |= 1 << i
+                new_state.zobrist ^= topo.line_keys[player][i]
+        if lines != (self.p1_lines if self.p1_turn else self.p2_lines):
+            # Keep the running counts of captured ley-lines up to date, so
+            # that is_winner is a single comparison.
+            if self.p1_turn:
+                new_state.p1_lines = lines
+                new_state.p1_captured = lines.bit_count()
+            else:
+                new_state.p2_lines = lines
+                new_state.p2_captured = lines.bit_count()
         return new_state
 
+    def __eq__(self, other: Any) -> bool:
+        """
+        Return whether other is the same position of Stonehenge as this
+        StonehengeState. Overrides GameState.__eq__
+
+        >>> state = StonehengeState(True, 2)
+        >>> state_1 = state.make_move('A').make_move('G').make_move('B')
+        >>> state_2 = state.make_move('B').make_move('G').make_move('A')
+        >>> state_1 == state_2 and hash(state_1) == hash(state_2)
+        True
+        >>> state_1 == StonehengeState(False, 2)
+        False
+        """
+        return type(other) is StonehengeState and \
+            self.zobrist == other.zobrist and \
+            self.p1_turn == other.p1_turn and \
+            self.topology is other.topology and \
+            self.p1_cells == other.p1_cells and \
+            self.p2_cells == other.p2_cells and \
+            self.p1_lines == other.p1_lines and \
+            self.p2_lines == other.p2_lines
+
+    def __hash__(self) -> int:
+        """
+        Return a hash of this StonehengeState, consistent with __eq__.
+        Overrides GameState.__hash__
+        """
+        return self.zobrist
+
+    def canonical(self) -> 'StonehengeState':
+        """
+        Return the representative of the rotations and reflections of this
+        state, as found by canonicalize. Overrides GameState.canonical
+        """
+        return canonicalize(self)[0]
+
+    def __getstate__(self) -> Tuple[bool, int, int, int, int, int, int]:
+        """
+        Return the fields needed to pickle this StonehengeState. The topology
+        is stored as its board size, so unpickled states share the topology
+        of their process.
+        """
+        return (self.p1_turn, self.board_size, self.p1_cells, self.p2_cells,
+                self.p1_lines, self.p2_lines, self.zobrist)
+
+    def __setstate__(self, fields: Tuple[bool, int, int, int, int, int,
+                                         int]) -> None:
+        """
+        Restore this StonehengeState from fields returned by __getstate__.
+
+        >>> import pickle
+        >>> state = StonehengeState(True, 2).make_move('A')
+        >>> copy = pickle.loads(pickle.dumps(state))
+        >>> copy == state and copy.topology is state.topology
+        True
+        """
+        self.p1_turn, board_size, self.p1_cells, self.p2_cells, \
+            self.p1_lines, self.p2_lines, self.zobrist = fields
+        self.p1_captured = self.p1_lines.bit_count()
+        self.p2_captured = self.p2_lines.bit_count()
+        self.topology = topology(board_size)
+
     def __repr__(self) -> str:
         """
         Return a representation of this state of Stonehenge (which can be used
@@ -327,26 +731,132 @@ class StonehengeState(GameState):
         >>> StonehengeState(True, 1).make_move('A').rough_outcome()
         -1
         """
-        current = 1 if self.p1_turn is True else 2
-        opponent = 2 if current == 1 else 1
-        states = [self.make_move(x) for x in self.get_possible_moves()]
+        topo = self.topology
+        if self.p1_turn:
+            own, opp = self.p1_cells, self.p2_cells
+            own_captured, opp_captured = self.p1_captured, self.p2_captured
+        else:
+            own, opp = self.p2_cells, self.p1_cells
+            own_captured, opp_captured = self.p2_captured, self.p1_captured
+        taken = self.p1_lines | self.p2_lines
+        # For each possible move, the ley-lines it would capture for the
+        # current player, and those it would capture for the opponent if
+        # the opponent claimed it instead: all rough_outcome needs to know
+        # about the next two moves, found without making them.
+        moves = [CELL_INDEX[move] for move in self.get_possible_moves()]
+        own_gains, opp_gains = [], []
+        for index in moves:
+            own_gain, opp_gain = 0, 0
+            for i in topo.cell_lines[index]:
+                if not taken >> i & 1:
+                    mask, threshold = topo.masks[i], topo.thresholds[i]
+                    if (own & mask).bit_count() + 1 >= threshold:
+                        own_gain |= 1 << i
+                    if (opp & mask).bit_count() + 1 >= threshold:
+                        opp_gain |= 1 << i
+            own_gains.append(own_gain)
+            opp_gains.append(opp_gain)
         # Return WIN if possible for current player to win
-        if any([is_winner(x, current) for x in states]):
+        if any(own_captured + gain.bit_count() >= topo.lines_to_win
+               for gain in own_gains):
             return self.WIN
-        substates = [[x.make_move(y) for y in x.get_possible_moves()]
-                     for x in states]
-        # Return LOSE if possible for opponent to win in all resulting states
-        if all([any([is_winner(s, opponent) for s in l]) for l in substates]):
+        # Return LOSE if possible for opponent to win after every move: the
+        # opponent's reply captures its lines that the move did not take.
+        opp_needed = topo.lines_to_win - opp_captured
+        threats = [(index, gain) for index, gain in zip(moves, opp_gains)
+                   if gain.bit_count() >= opp_needed]
+        if all(any(reply != index and
+                   (gain & ~own_gain).bit_count() >= opp_needed
+                   for reply, gain in threats)
+               for index, own_gain in zip(moves, own_gains)):
             return self.LOSE
         # Return estimate based on key-line capture difference
-        lines = sum([self.mark_dl, self.mark_dr, self.mark_row], [])
-        num_cur = sum([1 for x in lines if x == str(current)])
-        num_opp = sum([1 for x in lines if x == str(opponent)])
-        if num_cur == num_opp:
+        num_lines = len(topo.lines)
+        if own_captured == opp_captured:
             return self.DRAW
-        elif num_cur > num_opp:
-            return (num_cur - num_opp) / (len(lines) / 2)
-        return -((num_opp - num_cur) / (len(lines) / 2))
+        elif own_captured > opp_captured:
+            return (own_captured - opp_captured) / (num_lines / 2)
+        return -((opp_captured - own_captured) / (num_lines / 2))
+
+
+# Position of each cell name in StonehengeState.CELLS
+CELL_INDEX = {cell: i for i, cell in enumerate(StonehengeState.CELLS)}
+# Longest side of a board with a name in StonehengeState.CELLS for each cell
+MAX_SIDE_LENGTH = max(n for n in range(1, len(StonehengeState.CELLS))
+                      if sum(range(3, 3 + n)) <= len(StonehengeState.CELLS))
+
+
+def permute_bits(bits: int, permutation: Tuple[int, ...]) -> int:
+    """
+    Return bits with each set bit i moved to bit permutation[i].
+
+    >>> bin(permute_bits(0b011, (1, 2, 0)))
+    '0b110'
+    """
+    result = 0
+    while bits:
+        low = bits & -bits
+        result |= 1 << permutation[low.bit_length() - 1]
+        bits ^= low
+    return result
+
+
+def create_state(p1_turn: bool, board_size: int, p1_cells: int,
+                 p2_cells: int, p1_lines: int, p2_lines: int) \
+        -> StonehengeState:
+    """
+    Return the StonehengeState with the given fields, computing its Zobrist
+    hash from scratch.
+
+    >>> state = StonehengeState(True, 2).make_move('A')
+    >>> state == create_state(False, 2, 0b1, 0, 0b1000001, 0)
+    True
+    """
+    topo = topology(board_size)
+    zobrist = topo.empty_key ^ (topo.turn_key if p1_turn else 0)
+    for player, (cells, lines) in enumerate([(p1_cells, p1_lines),
+                                             (p2_cells, p2_lines)]):
+        for i in range(len(topo.cells)):
+            if cells >> i & 1:
+                zobrist ^= topo.cell_keys[player][i]
+        for i in range(len(topo.lines)):
+            if lines >> i & 1:
+                zobrist ^= topo.line_keys[player][i]
+    state = StonehengeState.__new__(StonehengeState)
+    state.__setstate__((p1_turn, board_size, p1_cells, p2_cells, p1_lines,
+                        p2_lines, zobrist))
+    return state
+
+
+def canonicalize(state: StonehengeState) \
+        -> Tuple[StonehengeState, Dict[str, str]]:
+    """
+    Return the representative of the positions that are rotations or
+    reflections of state, which all have the same score, together with a
+    dict mapping each move in the representative to the equivalent move in
+    state.
+
+    >>> state_1 = StonehengeState(True, 2).make_move('A')
+    >>> state_2 = StonehengeState(True, 2).make_move('B')
+    >>> canonicalize(state_1)[0] == canonicalize(state_2)[0]
+    True
+    >>> canonical, moves = canonicalize(state_2)
+    >>> moves['A']
+    'B'
+    """
+    topo = state.topology
+    best, best_cells = None, None
+    for cells, lines in topo.symmetries:
+        key = (permute_bits(state.p1_cells, cells),
+               permute_bits(state.p2_cells, cells),
+               permute_bits(state.p1_lines, lines),
+               permute_bits(state.p2_lines, lines))
+        if best is None or key < best:
+            best, best_cells = key, cells
+    moves = {topo.cells[j]: topo.cells[i] for i, j in enumerate(best_cells)}
+    if best_cells == topo.symmetries[0][0]:
+        return state, moves
+    return create_state(state.p1_turn, topo.board_size, *best), moves
 
 
 class StonehengeGame(Game):
@@ -363,14 +873,29 @@ class StonehengeGame(Game):
                    'ley-line. The player who first captures at least half o' +\
                    'f the ley-lines wins!'
 
-    def __init__(self, p1_starts: bool) -> None:
+    def __init__(self, p1_starts: bool,
+                 side_length: Union[int, None] = None) -> None:
         """
-        Initialize this Game, using p1_starts to find who the first player is.
+        Initialize this Game, using p1_starts to find who the first player is,
+        on a board whose sides have length side_length, from 1 to
+        MAX_SIDE_LENGTH. The length is asked for if side_length is None.
         Overrides Game.__init__
+
+        >>> StonehengeGame(True, 2).current_state.board_size
+        2
+        >>> StonehengeGame(True, 6)
+        Traceback (most recent call last):
+        ...
+        ValueError: side_length must be between 1 and 5
         """
-        side_length = int(input('Enter the length of the board\'s sides: '))
-        while side_length < 1:
+        if side_length is None:
             side_length = int(input('Enter the length of the board\'s sides: '))
+            while not 1 <= side_length <= MAX_SIDE_LENGTH:
+                side_length = int(
+                    input('Enter the length of the board\'s sides: '))
+        elif not 1 <= side_length <= MAX_SIDE_LENGTH:
+            raise ValueError('side_length must be between 1 and {}'.format(
+                MAX_SIDE_LENGTH))
         self.current_state = StonehengeState(p1_starts, side_length)
 
     def get_instructions(self) -> str:
@@ -384,7 +909,7 @@ class StonehengeGame(Game):
         Return whether or not this game is over at state. Overrides
         Game.is_over
         """
-        return is_winner(state, 1) or is_winner(state, 2)
+        return state.winner != 0
 
     def is_winner(self, player: str) -> bool:
         """
@@ -393,8 +918,34 @@ class StonehengeGame(Game):
         Precondition: player is 'p1' or 'p2'.
         """
         current_player = 1 if player == 'p1' else 2
-        return self.is_over(self.current_state) and is_winner(
-            self.current_state, current_player)
+        return self.current_state.winner == current_player
+
+    def winner(self, state: StonehengeState) -> Union[str, None]:
+        """
+        Return the player, 'p1' or 'p2', who has won at state, or None if the
+        game is not over at state. Does not use current_state. Overrides
+        Game.winner
+
+        >>> game = StonehengeGame(True, 1)
+        >>> game.winner(game.current_state.make_move('A'))
+        'p1'
+        >>> game.winner(game.current_state) is None
+        True
+        """
+        return ('p1', 'p2')[state.winner - 1] if state.winner else None
+
+    def terminal_value(self, state: StonehengeState) -> int:
+        """
+        Return the score of state, a state where this game is over, for the
+        player whose turn it is at state. Overrides Game.terminal_value
+
+        >>> game = StonehengeGame(True, 1)
+        >>> game.terminal_value(game.current_state.make_move('A'))
+        -1
+        """
+        if not state.winner:
+            return 0
+        return 1 if (state.winner == 1) == state.p1_turn else -1
 
     def str_to_move(self, string: str) -> str:
         """
@@ -0,0 +1,317 @@
+"""
+Evaluate many Stonehenge positions at once with NumPy.
+
+A StateBatch holds positions on boards of one size as arrays: the owner of
+every cell and of every ley-line (0 for nobody, else the player), and whose
+turn it is. Line ownership cannot be recovered from the cells alone, as a
+ley-line belongs to whichever player reached half of its cells first, so it
+is carried along from the states packed into the batch.
+
+The cells on each ley-line form an incidence matrix, and the number of
+cells each player holds on every ley-line of every position is one matrix
+product. Captures, winners, rough_outcome scores, moves and random playouts
+are then computed for the whole batch from those counts.
+
+NumPy is required for this module, unlike the rest of the games.
+
+NOTE: You do not have to run python-ta on this file.
+"""
+from typing import Dict, List, NamedTuple
+import numpy
+from stonehenge import StonehengeState, create_state, topology
+
+_INCIDENCE: Dict[int, numpy.ndarray] = {}
+_SHARED_LINES: Dict[int, numpy.ndarray] = {}
+
+
+def incidence_matrix(board_size: int) -> numpy.ndarray:
+    """
+    Return the matrix whose entry [cell, line] is 1 if the cell is on the
+    ley-line and 0 otherwise, for boards of size board_size. The matrix is
+    built once per size and must not be changed.
+
+    >>> incidence_matrix(1).tolist()
+    [[1, 0, 0, 1, 1, 0], [0, 1, 1, 0, 1, 0], [0, 1, 0, 1, 0, 1]]
+    """
+    if board_size not in _INCIDENCE:
+        topo = topology(board_size)
+        matrix = numpy.zeros((len(topo.cells), len(topo.lines)), numpy.int16)
+        for line, cells in enumerate(topo.lines):
+            matrix[list(cells), line] = 1
+        matrix.setflags(write=False)
+        _INCIDENCE[board_size] = matrix
+    return _INCIDENCE[board_size]
+
+
+def shared_lines(board_size: int) -> numpy.ndarray:
+    """
+    Return the matrix whose entry [cell, other] is the ley-line through both
+    cells, for boards of size board_size. Two different cells share at most
+    one ley-line; where they share none, and on the diagonal, the entry is
+    the number of ley-lines, one past the last ley-line.
+
+    >>> shared_lines(1).tolist()
+    [[6, 4, 3], [4, 6, 1], [3, 1, 6]]
+    """
+    if board_size not in _SHARED_LINES:
+        topo = topology(board_size)
+        num_cells = len(topo.cells)
+        matrix = numpy.full((num_cells, num_cells), len(topo.lines),
+                            numpy.intp)
+        for line, cells in enumerate(topo.lines):
+            for cell in cells:
+                for other in cells:
+                    if cell != other:
+                        matrix[cell, other] = line
+        matrix.setflags(write=False)
+        _SHARED_LINES[board_size] = matrix
+    return _SHARED_LINES[board_size]
+
+
+class StateBatch(NamedTuple):
+    """
+    Positions on Stonehenge boards of one size, one per row of each array.
+
+    board_size - length of the boards' sides
+    cells - owner of each cell, shape (positions, cells)
+    lines - owner of each ley-line, shape (positions, ley-lines)
+    p1_turn - whether it is player 1's turn, shape (positions,)
+    """
+    board_size: int
+    cells: numpy.ndarray
+    lines: numpy.ndarray
+    p1_turn: numpy.ndarray
+
+    def __len__(self) -> int:
+        """
+        Return the number of positions in this batch.
+        """
+        return len(self.p1_turn)
+
+
+def _owners(p1_bits: int, p2_bits: int, count: int) -> List[int]:
+    """
+    Return the owner, 0, 1 or 2, of each of count items whose ownership by
+    players 1 and 2 is given as bitmasks.
+    """
+    return [1 if p1_bits >> i & 1 else 2 if p2_bits >> i & 1 else 0
+            for i in range(count)]
+
+
+def pack(states: List[StonehengeState]) -> StateBatch:
+    """
+    Return the batch of states, which must all be on boards of one size.
+
+    >>> batch = pack([StonehengeState(True, 1).make_move('B')])
+    >>> batch.cells.tolist(), batch.lines.tolist(), batch.p1_turn.tolist()
+    ([[0, 1, 0]], [[0, 1, 1, 0, 1, 0]], [False])
+    """
+    board_size = states[0].board_size
+    if any(state.board_size != board_size for state in states):
+        raise ValueError('states must all be on boards of the same size')
+    topo = topology(board_size)
+    num_cells, num_lines = len(topo.cells), len(topo.lines)
+    return StateBatch(
+        board_size,
+        numpy.array([_owners(s.p1_cells, s.p2_cells, num_cells)
+                     for s in states], numpy.int8).reshape(-1, num_cells),
+        numpy.array([_owners(s.p1_lines, s.p2_lines, num_lines)
+                     for s in states], numpy.int8).reshape(-1, num_lines),
+        numpy.array([s.p1_turn for s in states], bool))
+
+
+def unpack(batch: StateBatch) -> List[StonehengeState]:
+    """
+    Return the StonehengeStates of batch, in order.
+
+    >>> state = StonehengeState(False, 2).make_move('D').make_move('A')
+    >>> unpack(pack([state])) == [state]
+    True
+    """
+    weights = [1 << i for i in range(batch.cells.shape[1])]
+    line_weights = [1 << i for i in range(batch.lines.shape[1])]
+    states = []
+    for cells, lines, p1_turn in zip(batch.cells.tolist(),
+                                     batch.lines.tolist(),
+                                     batch.p1_turn.tolist()):
+        states.append(create_state(
+            p1_turn, batch.board_size,
+            sum(w for w, owner in zip(weights, cells) if owner == 1),
+            sum(w for w, owner in zip(weights, cells) if owner == 2),
+            sum(w for w, owner in zip(line_weights, lines) if owner == 1),
+            sum(w for w, owner in zip(line_weights, lines) if owner == 2)))
+    return states
+
+
+def line_counts(batch: StateBatch, player: int) -> numpy.ndarray:
+    """
+    Return the number of cells player holds on each ley-line of each
+    position of batch, shape (positions, ley-lines).
+
+    >>> batch = pack([StonehengeState(True, 1).make_move('A')])
+    >>> line_counts(batch, 1).tolist()
+    [[1, 0, 0, 1, 1, 0]]
+    """
+    return (batch.cells == player).astype(numpy.int16) @ \
+        incidence_matrix(batch.board_size)
+
+
+def captured(batch: StateBatch) -> numpy.ndarray:
+    """
+    Return the number of ley-lines captured by players 1 and 2 in each
+    position of batch, shape (positions, 2).
+    """
+    return numpy.stack([(batch.lines == 1).sum(axis=1),
+                        (batch.lines == 2).sum(axis=1)], axis=1)
+
+
+def winners(batch: StateBatch) -> numpy.ndarray:
+    """
+    Return the player, 1 or 2, who has won in each position of batch, or 0
+    where the game is not over, as StonehengeState.winner does.
+
+    >>> state = StonehengeState(True, 2)
+    >>> winners(pack([state, state.make_move('A').make_move('B')])).tolist()
+    [0, 0]
+    """
+    lines_to_win = topology(batch.board_size).lines_to_win
+    counts = captured(batch)
+    return numpy.where(counts[:, 0] >= lines_to_win, 1,
+                       numpy.where(counts[:, 1] >= lines_to_win, 2,
+                                   0)).astype(numpy.int8)
+
+
+def legal_moves(batch: StateBatch) -> numpy.ndarray:
+    """
+    Return whether each cell may be claimed in each position of batch, as
+    in StonehengeState.get_possible_moves, shape (positions, cells).
+    """
+    return (batch.cells == 0) & (winners(batch) == 0)[:, None]
+
+
+def _players(batch: StateBatch) -> numpy.ndarray:
+    """
+    Return the player whose turn it is in each position of batch.
+    """
+    return numpy.where(batch.p1_turn, 1, 2).astype(numpy.int8)
+
+
+def rough_scores(batch: StateBatch) -> numpy.ndarray:
+    """
+    Return StonehengeState.rough_outcome of each position of batch.
+
+    Per ley-line counts give, for every free cell, the ley-lines it would
+    capture for the player to move and for the opponent. The current
+    player can win at once if a cell captures enough lines for them, and
+    loses if, whatever cell they claim, another one captures enough of the
+    remaining lines for the opponent.
+
+    >>> state = StonehengeState(True, 2)
+    >>> rough_scores(pack([state, state.make_move('A')])).tolist()
+    [0.0, -0.4444444444444444]
+    """
+    topo = topology(batch.board_size)
+    incidence = incidence_matrix(batch.board_size)
+    thresholds = numpy.array(topo.thresholds, numpy.int16)
+    counts = [line_counts(batch, 1), line_counts(batch, 2)]
+    current = batch.p1_turn[:, None]
+    own = numpy.where(current, counts[0], counts[1])
+    opp = numpy.where(current, counts[1], counts[0])
+    free_lines = batch.lines == 0
+    # Ley-lines one cell short of capture by each player, shape
+    # (positions, ley-lines)
+    own_near = free_lines & (own + 1 >= thresholds)
+    opp_near = free_lines & (opp + 1 >= thresholds)
+    # Ley-lines each cell would capture, counted, shape (positions, cells)
+    own_gain = own_near.astype(numpy.int16) @ incidence.T
+    opp_gain = opp_near.astype(numpy.int16) @ incidence.T
+    # shared[p, c, d]: 1 if the ley-line through both c and d could be
+    # captured by the opponent with d, but the current player captures it
+    # first with c. A column of zeros stands for the missing ley-line of
+    # cells that share none.
+    both_near = numpy.zeros((len(batch), len(topo.lines) + 1), numpy.int16)
+    both_near[:, :-1] = own_near & opp_near
+    shared = both_near[:, shared_lines(batch.board_size)]
+    lines_captured = captured(batch)
+    own_captured = numpy.where(batch.p1_turn, lines_captured[:, 0],
+                               lines_captured[:, 1])
+    opp_captured = numpy.where(batch.p1_turn, lines_captured[:, 1],
+                               lines_captured[:, 0])
+    moves = legal_moves(batch)
+    wins = (moves & (own_gain + own_captured[:, None] >=
+                     topo.lines_to_win)).any(axis=1)
+    # replies[p, c, d]: after the current player claims c, the opponent
+    # claiming d wins
+    replies = (opp_gain[:, None, :] - shared +
+               opp_captured[:, None, None] >= topo.lines_to_win)
+    replies &= moves[:, None, :] & ~numpy.eye(moves.shape[1], dtype=bool)
+    losses = (replies.any(axis=2) | ~moves).all(axis=1)
+    estimate = (own_captured - opp_captured) / (len(topo.lines) / 2)
+    return numpy.where(wins, StonehengeState.WIN,
+                       numpy.where(losses, StonehengeState.LOSE, estimate))
+
+
+def make_moves(batch: StateBatch, moves: numpy.ndarray) -> StateBatch:
+    """
+    Return the batch that results from the player to move in each position
+    of batch claiming the cell numbered moves[i] in position i, as
+    StonehengeState.make_move does. Raises ValueError if a move is not
+    legal.
+
+    >>> state = StonehengeState(True, 1)
+    >>> batch = make_moves(pack([state, state]), numpy.array([0, 2]))
+    >>> unpack(batch) == [state.make_move('A'), state.make_move('C')]
+    True
+    """
+    moves = numpy.asarray(moves)
+    rows = numpy.arange(len(batch))
+    if not legal_moves(batch)[rows, moves].all():
+        raise ValueError('every move must claim a free cell in a game that '
+                         'is not over')
+    players = _players(batch)
+    cells = batch.cells.copy()
+    cells[rows, moves] = players
+    moved = StateBatch(batch.board_size, cells, batch.lines.copy(),
+                       ~batch.p1_turn)
+    # A ley-line is captured by the first player to claim half of it, so
+    # only the mover can capture one now.
+    counts = numpy.where(batch.p1_turn[:, None], line_counts(moved, 1),
+                         line_counts(moved, 2))
+    thresholds = numpy.array(topology(batch.board_size).thresholds)
+    capture = (moved.lines == 0) & (counts >= thresholds)
+    moved.lines[capture] = numpy.broadcast_to(players[:, None],
+                                              capture.shape)[capture]
+    return moved
+
+
+def playouts(batch: StateBatch,
+             rng: numpy.random.Generator) -> StateBatch:
+    """
+    Return the batch of final positions reached by playing uniformly random
+    moves, chosen with rng, in every position of batch until no moves are
+    left. As with StonehengeState.playout, the final positions can be
+    scored with winners.
+
+    >>> final = playouts(pack([StonehengeState(True, 2)] * 8),
+    ...                  numpy.random.default_rng(0))
+    >>> bool((winners(final) != 0).all())
+    True
+    """
+    while True:
+        moves = legal_moves(batch)
+        active = moves.any(axis=1)
+        if not active.any():
+            return batch
+        # The largest random key among the free cells picks a cell
+        # uniformly.
+        keys = numpy.where(moves, rng.random(moves.shape), -1.0)
+        chosen = keys.argmax(axis=1)
+        rows = numpy.flatnonzero(active)
+        sub = StateBatch(batch.board_size, batch.cells[rows],
+                         batch.lines[rows], batch.p1_turn[rows])
+        sub = make_moves(sub, chosen[rows])
+        cells, lines, p1_turn = (batch.cells.copy(), batch.lines.copy(),
+                                 batch.p1_turn.copy())
+        cells[rows], lines[rows], p1_turn[rows] = sub.cells, sub.lines, \
+            sub.p1_turn
+        batch = StateBatch(batch.board_size, cells, lines, p1_turn)
@@ -0,0 +1,83 @@
+"""
+Unittests for evaluating batches of Stonehenge positions with NumPy, checked
+against the same evaluations made one StonehengeState at a time.
+"""
+import random
+import unittest
+
+try:
+    import numpy
+    import stonehenge_batch
+except ImportError:  # pragma: no cover - depends on the environment
+    numpy = None
+from benchmark import random_state
+from stonehenge import StonehengeState
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class StonehengeBatchUnitTests(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        # Positions from random games, stopped after a random number of moves
+        self.batches = [[random_state(rng, size,
+                                      rng.randint(0, 3 * size * size))
+                         for _ in range(200)] for size in range(1, 6)]
+
+    def test_pack_round_trip(self):
+        """
+        Test that unpacking a packed batch gives back the same states.
+        """
+        for states in self.batches:
+            batch = stonehenge_batch.pack(states)
+            self.assertEqual(stonehenge_batch.unpack(batch), states)
+
+    def test_winners_and_rough_scores(self):
+        """
+        Test that winners and rough scores match those of each state.
+        """
+        for states in self.batches:
+            batch = stonehenge_batch.pack(states)
+            self.assertEqual(stonehenge_batch.winners(batch).tolist(),
+                             [state.winner for state in states])
+            self.assertEqual(stonehenge_batch.rough_scores(batch).tolist(),
+                             [state.rough_outcome() for state in states])
+
+    def test_make_moves(self):
+        """
+        Test that a batch of moves makes the same captures as make_move.
+        """
+        rng = random.Random(1)
+        for states in self.batches:
+            states = [state for state in states if state.get_possible_moves()]
+            moves = [rng.choice(state.get_possible_moves())
+                     for state in states]
+            batch = stonehenge_batch.make_moves(
+                stonehenge_batch.pack(states),
+                numpy.array([StonehengeState.CELLS.index(move)
+                             for move in moves]))
+            self.assertEqual(stonehenge_batch.unpack(batch),
+                             [state.make_move(move)
+                              for state, move in zip(states, moves)])
+
+    def test_illegal_move(self):
+        """
+        Test that claiming a cell that is already claimed is refused.
+        """
+        batch = stonehenge_batch.pack([StonehengeState(True, 2).make_move(
+            'A')])
+        with self.assertRaises(ValueError):
+            stonehenge_batch.make_moves(batch, numpy.array([0]))
+
+    def test_playouts_finish_games(self):
+        """
+        Test that every playout ends with a winner and no moves left.
+        """
+        for states in self.batches:
+            final = stonehenge_batch.playouts(stonehenge_batch.pack(states),
+                                              numpy.random.default_rng(0))
+            self.assertTrue((stonehenge_batch.winners(final) != 0).all())
+            self.assertFalse(stonehenge_batch.legal_moves(final).any())
+
+
+if __name__ == "__main__":
+    unittest.main()
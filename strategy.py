@@ -5,91 +5,424 @@ NOTE: Make sure this file adheres to python-ta.
 Adjust the type annotations as needed, and implement both a recursive
 and an iterative version of minimax.
 """
-from typing import Any
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Tuple, Union
 from tree import Tree
+from transposition_table import TranspositionTable
+from search_stats import SearchStats, phase
 
+# Scores of states solved by the minimax strategies, shared between calls so
+# that later moves in a game reuse the positions solved for earlier ones.
+TRANSPOSITION_TABLE = TranspositionTable()
+# Alpha-beta only proves bounds on some scores, so it keeps (score, bound)
+# pairs in a table of its own.
+ALPHA_BETA_TABLE = TranspositionTable()
 
-def state_score_r(game: Any, state: Any) -> int:
+# Kinds of bound on a score stored in ALPHA_BETA_TABLE
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+def state_score_r(game: Any, state: Any,
+                  table: Union[TranspositionTable, None] = None,
+                  stats: Union[SearchStats, None] = None,
+                  depth: int = 0) -> int:
     """
     Return the move score for a state of a game. This implementation is
-    recursive.
+    recursive. Scores are looked up in and stored to table, if given, and
+    the search is recorded in stats, if given, with state depth moves from
+    the searched position.
     """
+    if stats is not None:
+        stats.visit(depth)
+    if table is not None:
+        score = table.get(state)
+        if stats is not None:
+            stats.lookup(score is not None)
+        if score is not None:
+            return score
+    score = state.known_score()
+    if score is not None:
+        return score
     if game.is_over(state):
-        current = 'p1' if state.p1_turn is True else 'p2'
-        other = 'p1' if current == 'p2' else 'p2'
-        old_state = game.current_state
-        game.current_state = state
-        if game.is_winner(current) and not game.is_winner(other):
-            game.current_state = old_state
-            return 1
-        elif game.is_winner(other) and not game.is_winner(current):
-            game.current_state = old_state
-            return -1
-        game.current_state = old_state
-        return 0
-    states = [state.make_move(m) for m in state.get_possible_moves()]
-    return max([-state_score_r(game, s) for s in states])
-
-
-def state_score_i(game: Any, state_: Any) -> int:
+        score = game.terminal_value(state)
+        if stats is not None:
+            stats.terminal += 1
+    else:
+        states = [state.make_move(m) for m in state.get_possible_moves()]
+        if stats is not None:
+            stats.expand(len(states))
+        score = max([-state_score_r(game, s, table, stats, depth + 1)
+                     for s in states])
+    if table is not None:
+        table.put(state, score)
+    return score
+
+
+def state_score_i(game: Any, state_: Any,
+                  table: Union[TranspositionTable, None] = None,
+                  stats: Union[SearchStats, None] = None,
+                  depth_: int = 0) -> int:
     """
     Return the move score for a state of a game. This implementation is
-    iterative.
+    iterative. Scores are looked up in and stored to table, if given, and
+    the search is recorded in stats, if given, with state_ depth_ moves from
+    the searched position.
+
+    Memory use grows with the depth of the game times its branching factor,
+    as the subtree below a state is discarded once the state is scored.
     """
     initial = Tree(state_)
-    stack = [initial]
+    stack = [(initial, depth_)]
     while stack != []:
-        tree = stack.pop()
+        tree, depth = stack.pop()
         state = tree.value
+        if tree.children == []:
+            if stats is not None:
+                stats.visit(depth)
+            if table is not None:
+                tree.score = table.get(state)
+                if stats is not None:
+                    stats.lookup(tree.score is not None)
+            if tree.score is None:
+                tree.score = state.known_score()
+            if tree.score is not None:
+                continue
         if game.is_over(state):
-            current = 'p1' if state.p1_turn is True else 'p2'
-            other = 'p1' if current == 'p2' else 'p2'
-            old_state = game.current_state
-            game.current_state = state
-            if game.is_winner(current) and not game.is_winner(other):
-                game.current_state = old_state
-                tree.score = 1
-            elif game.is_winner(other) and not game.is_winner(current):
-                game.current_state = old_state
-                tree.score = -1
-            else:
-                game.current_state = old_state
-                tree.score = 0
+            tree.score = game.terminal_value(state)
+            if stats is not None:
+                stats.terminal += 1
         elif tree.children == []:
             states = [state.make_move(m) for m in state.get_possible_moves()]
+            if stats is not None:
+                stats.expand(len(states))
             trees = [Tree(s) for s in states]
             tree.children = trees
-            stack.append(tree)
+            stack.append((tree, depth))
             for t in trees:
-                stack.append(t)
+                stack.append((t, depth + 1))
+            continue
         else:
             tree.score = max([-c.score for c in tree.children])
+            # The subtree is no longer needed once its score is known, so
+            # only the nodes on the stack and their siblings stay alive.
+            tree.children = []
+        if table is not None:
+            table.put(state, tree.score)
     return initial.score
 
 
-def recursive_minimax_strategy(game: Any) -> Any:
+def recursive_minimax_strategy(game: Any,
+                               stats: Union[SearchStats, None] = None) -> Any:
     """
     Return a move for game that leads to a win, if a win is possible. This
-    implementation is recursive.
+    implementation is recursive. The search is recorded in stats, if given.
     """
-    moves = game.current_state.get_possible_moves()
-    possible_states = [game.current_state.make_move(m) for m in moves]
-    scores = [-state_score_r(game, s) for s in possible_states]
+    with phase(stats, 'expand'):
+        moves = game.current_state.get_possible_moves()
+        possible_states = [game.current_state.make_move(m) for m in moves]
+    if stats is not None:
+        stats.visit(0)
+        stats.expand(len(moves))
+    with phase(stats, 'search'):
+        scores = [-state_score_r(game, s, TRANSPOSITION_TABLE, stats, 1)
+                  for s in possible_states]
     return moves[scores.index(max(scores))]
 
 
-def iterative_minimax_strategy(game: Any) -> Any:
+def iterative_minimax_strategy(game: Any,
+                               stats: Union[SearchStats, None] = None) -> Any:
     """
     Return a move for game that leads to a win, if a win is possible. This
-    implementation is iterative.
+    implementation is iterative. The search is recorded in stats, if given.
     """
-    moves = game.current_state.get_possible_moves()
-    possible_states = [game.current_state.make_move(m) for m in moves]
-    scores = [state_score_i(game, s) for s in possible_states]
+    with phase(stats, 'expand'):
+        moves = game.current_state.get_possible_moves()
+        possible_states = [game.current_state.make_move(m) for m in moves]
+    if stats is not None:
+        stats.visit(0)
+        stats.expand(len(moves))
+    with phase(stats, 'search'):
+        scores = [state_score_i(game, s, TRANSPOSITION_TABLE, stats, 1)
+                  for s in possible_states]
     scores_ = [-s for s in scores]
     return moves[scores_.index(max(scores_))]
 
 
+def _score_in_worker(game: Any, depth: Union[int, None],
+                     state: Any) -> Tuple[int, Union[SearchStats, None]]:
+    """
+    Return the move score for state, a state of game, and the statistics of
+    its search, with state depth moves from the searched position, or None
+    if depth is None. Runs in a worker process, where TRANSPOSITION_TABLE is
+    that process's own table.
+    """
+    stats = None if depth is None else SearchStats()
+    return state_score_r(game, state, TRANSPOSITION_TABLE, stats,
+                         depth or 0), stats
+
+
+def _split(game: Any, tree: Tree, depth: int,
+           frontier: Dict[Any, List[Tree]],
+           stats: Union[SearchStats, None] = None, ply: int = 1) -> None:
+    """
+    Expand tree depth moves deep, scoring states where game is over, and
+    add every unscored leaf of the expansion to frontier under its state.
+    The expansion is recorded in stats, if given, with tree ply moves from
+    the searched position. A leaf is only visited here if its state is
+    already in frontier, as a cache hit; the worker solving the state
+    records the first visit.
+    """
+    state = tree.value
+    if depth == 0 and not game.is_over(state):
+        if stats is not None and state in frontier:
+            stats.visit(ply)
+            stats.lookup(True)
+        frontier.setdefault(state, []).append(tree)
+        return
+    if stats is not None:
+        stats.visit(ply)
+    if game.is_over(state):
+        tree.score = game.terminal_value(state)
+        if stats is not None:
+            stats.terminal += 1
+    else:
+        tree.children = [Tree(state.make_move(m))
+                         for m in state.get_possible_moves()]
+        if stats is not None:
+            stats.expand(len(tree.children))
+        for child in tree.children:
+            _split(game, child, depth - 1, frontier, stats, ply + 1)
+
+
+def _score_split(tree: Tree) -> int:
+    """
+    Return the score of tree, an expansion made by _split whose leaves have
+    all been scored.
+    """
+    if tree.score is None:
+        tree.score = max([-_score_split(c) for c in tree.children])
+    return tree.score
+
+
+def parallel_minimax_strategy(game: Any, split_depth: int = 2,
+                              max_workers: Union[int, None] = None,
+                              stats: Union[SearchStats, None] = None) -> Any:
+    """
+    Return a move for game that leads to a win, if a win is possible. The
+    game tree is expanded split_depth moves deep and the states at that depth
+    are solved with recursive minimax across max_workers processes (by
+    default, one per CPU). The move returned is the same as for
+    recursive_minimax_strategy. split_depth must be at least 1. The search
+    is recorded in stats, if given, including the workers' searches.
+    """
+    if split_depth < 1:
+        raise ValueError('split_depth must be at least 1')
+    with phase(stats, 'split'):
+        moves = game.current_state.get_possible_moves()
+        trees = [Tree(game.current_state.make_move(m)) for m in moves]
+        if stats is not None:
+            stats.visit(0)
+            stats.expand(len(moves))
+        # Positions reached by different move orders are only solved once.
+        frontier = {}
+        for tree in trees:
+            _split(game, tree, split_depth - 1, frontier, stats)
+    states = list(frontier)
+    if states:
+        with phase(stats, 'search'), \
+                ProcessPoolExecutor(max_workers) as executor:
+            results = executor.map(partial(
+                _score_in_worker, game,
+                None if stats is None else split_depth), states)
+            for state, (score, worker_stats) in zip(states, results):
+                for tree in frontier[state]:
+                    tree.score = score
+                if worker_stats is not None:
+                    stats.merge(worker_stats)
+    scores = [-_score_split(t) for t in trees]
+    return moves[scores.index(max(scores))]
+
+
+def state_score_ab(game: Any, state: Any, alpha: int = -1, beta: int = 1,
+                   table: Union[TranspositionTable, None] = None,
+                   stats: Union[SearchStats, None] = None,
+                   depth: int = 0) -> int:
+    """
+    Return the move score for a state of a game, searching with alpha-beta
+    pruning. The result is exact if it lies strictly between alpha and beta;
+    otherwise it is only a bound on the score on that same side of the
+    window. Scores and their bounds are looked up in and stored to table, if
+    given, and the search is recorded in stats, as for state_score_r.
+    """
+    alpha_ = alpha
+    if stats is not None:
+        stats.visit(depth)
+    if table is not None:
+        entry = table.get(state)
+        if stats is not None:
+            stats.lookup(entry is not None)
+        if entry is not None:
+            score, bound = entry
+            if bound == EXACT:
+                return score
+            elif bound == LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
+    score = state.known_score()
+    if score is not None:
+        return score
+    if game.is_over(state):
+        score = game.terminal_value(state)
+        if stats is not None:
+            stats.terminal += 1
+    else:
+        score = -2
+        moves = state.get_ordered_moves()
+        if stats is not None:
+            stats.expand(len(moves))
+        for move in moves:
+            score = max(score, -state_score_ab(game, state.make_move(move),
+                                               -beta, -alpha, table, stats,
+                                               depth + 1))
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+    if table is not None:
+        if score <= alpha_:
+            table.put(state, (score, UPPER))
+        elif score >= beta:
+            table.put(state, (score, LOWER))
+        else:
+            table.put(state, (score, EXACT))
+    return score
+
+
+def alpha_beta_strategy(game: Any,
+                        stats: Union[SearchStats, None] = None) -> Any:
+    """
+    Return a move for game that leads to a win, if a win is possible, using
+    minimax with alpha-beta pruning. Of the moves with the best score, the
+    one returned is the same as for the other minimax strategies. The search
+    is recorded in stats, if given.
+    """
+    moves = game.current_state.get_possible_moves()
+    if stats is not None:
+        stats.visit(0)
+        stats.expand(len(moves))
+    best_move, best_score = moves[0], -2
+    with phase(stats, 'search'):
+        for move in moves:
+            # Only a score better than best_score matters, so every other
+            # score may be cut off early as an upper bound.
+            score = -state_score_ab(game, game.current_state.make_move(move),
+                                    -1, -max(best_score, -1),
+                                    ALPHA_BETA_TABLE, stats, 1)
+            if score > best_score:
+                best_move, best_score = move, score
+            if best_score == 1:
+                break
+    return best_move
+
+
+class SearchTimeout(Exception):
+    """
+    Raised to abandon a search whose time budget has run out.
+    """
+    pass
+
+
+def state_score_dl(game: Any, state: Any, depth: int, alpha: float,
+                   beta: float, deadline: float, horizon: List[bool],
+                   stats: Union[SearchStats, None] = None,
+                   ply: int = 0) -> float:
+    """
+    Return the move score for a state of a game, searching depth moves ahead
+    with alpha-beta pruning and estimating the states at that depth with
+    rough_outcome. As with state_score_ab, a result outside the window
+    (alpha, beta) is only a bound.
+
+    horizon[0] is set to True if any state was estimated rather than
+    searched to the end of the game. SearchTimeout is raised once
+    time.perf_counter() passes deadline. The search is recorded in stats,
+    if given, with state ply moves from the searched position.
+    """
+    if time.perf_counter() > deadline:
+        raise SearchTimeout
+    if stats is not None:
+        stats.visit(ply)
+    score = state.known_score()
+    if score is not None:
+        return score
+    if game.is_over(state):
+        if stats is not None:
+            stats.terminal += 1
+        return game.terminal_value(state)
+    if depth == 0:
+        horizon[0] = True
+        return state.rough_outcome()
+    score = -2
+    moves = state.get_ordered_moves()
+    if stats is not None:
+        stats.expand(len(moves))
+    for move in moves:
+        score = max(score, -state_score_dl(game, state.make_move(move),
+                                           depth - 1, -beta, -alpha,
+                                           deadline, horizon, stats,
+                                           ply + 1))
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+    return score
+
+
+def iterative_deepening_strategy(game: Any, time_limit: float = 1.0,
+                                 stats: Union[SearchStats, None] = None) \
+        -> Any:
+    """
+    Return a move for game, searching one move deeper at a time until
+    time_limit seconds have passed, and returning the best move of the
+    deepest search that finished. States at the depth limit are estimated
+    with rough_outcome. Every search, including the one cut short, is
+    recorded in stats, if given, with the time spent searching to each
+    depth as a phase named after it.
+    """
+    deadline = time.perf_counter() + time_limit
+    moves = game.current_state.get_possible_moves()
+    best_move = moves[0]
+    depth = 1
+    while True:
+        # Search the best move of the previous depth first, for more cutoffs.
+        ordered = [best_move] + [m for m in moves if m != best_move]
+        depth_move, best_score, horizon = best_move, -2, [False]
+        if stats is not None:
+            stats.visit(0)
+            stats.expand(len(moves))
+        try:
+            with phase(stats, 'depth {}'.format(depth)):
+                for move in ordered:
+                    score = -state_score_dl(
+                        game, game.current_state.make_move(move), depth - 1,
+                        -1, -max(best_score, -1), deadline, horizon, stats,
+                        1)
+                    if score > best_score:
+                        depth_move, best_score = move, score
+                    if best_score == 1:
+                        break
+        except SearchTimeout:
+            return best_move
+        best_move = depth_move
+        # Stop once the result is certain: a forced win, or a search that
+        # reached the end of the game everywhere.
+        if best_score == 1 or not horizon[0]:
+            return best_move
+        depth += 1
+
+
 def interactive_strategy(game: Any) -> Any:
     """
     Return a move for game through interactively asking the user for input.
@@ -98,10 +431,12 @@ def interactive_strategy(game: Any) -> Any:
     return game.str_to_move(move)
 
 
-def rough_outcome_strategy(game: Any) -> Any:
+def rough_outcome_strategy(game: Any,
+                           stats: Union[SearchStats, None] = None) -> Any:
     """
     Return a move for game by picking a move which results in a state with
-    the lowest rough_outcome() for the opponent.
+    the lowest rough_outcome() for the opponent. Each state the moves lead
+    to counts as one node in stats, if given.
 
     NOTE: game.rough_outcome() should do the following:
         - For a state that's over, it returns the score for the current
@@ -122,16 +457,24 @@ def rough_outcome_strategy(game: Any) -> Any:
     best_move = None
     best_outcome = -2  # Temporarily -- just so we can replace this easily later
 
+    moves = current_state.get_possible_moves()
+    if stats is not None:
+        stats.visit(0)
+        stats.expand(len(moves))
+
     # Get the move that results in the lowest rough_outcome for the opponent
-    for move in current_state.get_possible_moves():
-        new_state = current_state.make_move(move)
-
-        # We multiply the below by -1 since a state that's bad for the opponent
-        # is good for us.
-        guessed_score = new_state.rough_outcome() * -1
-        if guessed_score > best_outcome:
-            best_outcome = guessed_score
-            best_move = move
+    with phase(stats, 'evaluate'):
+        for move in moves:
+            new_state = current_state.make_move(move)
+            if stats is not None:
+                stats.visit(1)
+
+            # We multiply the below by -1 since a state that's bad for the
+            # opponent is good for us.
+            guessed_score = new_state.rough_outcome() * -1
+            if guessed_score > best_outcome:
+                best_outcome = guessed_score
+                best_move = move
 
     # Return the move that resulted in the best rough_outcome
     return best_move
@@ -0,0 +1,378 @@
+"""
+Unittests for the strategies added on top of recursive and iterative minimax.
+
+Each strategy is checked against the positions used in
+minimax_unittest_basic.py, where it must choose the same moves as minimax.
+"""
+
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from unittest.mock import patch
+
+import strategy
+import subtract_square_state
+from game_interface import playable_games, usable_strategies
+from search_stats import SearchStats
+from stonehenge import MAX_SIDE_LENGTH, StonehengeState
+from subtract_square_solver import SOLVER
+from subtract_square_state import SubtractSquareState
+from transposition_table import TranspositionTable
+StonehengeGame = playable_games['h']
+SubtractSquareGame = playable_games['s']
+
+
+class MinimaxPositionTests:
+    """
+    Tests on the positions from minimax_unittest_basic.py, for a strategy
+    that should be able to solve them. Subclasses set strategy.
+    """
+
+    def test_subtract_square_4(self):
+        """
+        Test on a game of SubtractSquare with a value of 4, where the winning
+        move is immediately in sight.
+        """
+        game = SubtractSquareGame(True, 4)
+
+        self.assertEqual(self.strategy(game), game.str_to_move("4"))
+
+    def test_subtract_square_18(self):
+        """
+        Test on a game of SubtractSquare with a value of 18, where picking 4
+        or 9 will result in a loss.
+        """
+        game = SubtractSquareGame(True, 18)
+
+        self.assertIn(self.strategy(game),
+                      [game.str_to_move("1"), game.str_to_move("16")])
+
+    def test_stonehenge_one_winning_move(self):
+        """
+        Test on a game of Stonehenge where there is only 1 winning move that
+        is immediately in sight.
+        """
+        game = StonehengeGame(False, 3)
+        for move in ['K', 'A', 'C', 'B', 'F', 'E', 'G', 'D', 'I']:
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move))
+
+        self.assertEqual(self.strategy(game), game.str_to_move("H"))
+
+    def test_stonehenge_one_winning_move_not_immediate(self):
+        """
+        Test on a game of Stonehenge where there is only 1 winning move that
+        is not immediately in sight.
+        """
+        game = StonehengeGame(True, 2)
+        for move in ['A', 'F', 'D']:
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move))
+
+        self.assertEqual(self.strategy(game), game.str_to_move("E"))
+
+
+class AlphaBetaUnitTests(MinimaxPositionTests, unittest.TestCase):
+    strategy = staticmethod(usable_strategies['ab'])
+
+    def test_stonehenge_same_move_as_minimax(self):
+        """
+        Test that the move chosen in a Stonehenge midgame is the one chosen by
+        recursive minimax.
+        """
+        game = StonehengeGame(True, 3)
+        for move in ['A', 'L', 'F']:
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move))
+
+        self.assertEqual(self.strategy(game),
+                         usable_strategies['mr'](game))
+
+
+class ParallelMinimaxUnitTests(MinimaxPositionTests, unittest.TestCase):
+    strategy = staticmethod(usable_strategies['mp'])
+
+    def setUp(self):
+        # Forked workers inherit this process's table, so solve from empty.
+        strategy.TRANSPOSITION_TABLE.clear()
+
+    def test_stonehenge_same_move_as_minimax(self):
+        """
+        Test that the move chosen in a Stonehenge midgame is the one chosen by
+        recursive minimax, whatever the split depth.
+        """
+        game = StonehengeGame(True, 3)
+        for move in ['A', 'L', 'F']:
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move))
+
+        expected = usable_strategies['mr'](game)
+        for split_depth in [1, 2, 3]:
+            strategy.TRANSPOSITION_TABLE.clear()
+            self.assertEqual(usable_strategies['mp'](game, split_depth, 2),
+                             expected)
+
+    def test_split_depth_must_be_positive(self):
+        """
+        Test that a split depth below 1 is rejected rather than searched
+        serially.
+        """
+        game = StonehengeGame(True, 2)
+        for split_depth in [0, -1]:
+            with self.assertRaises(ValueError):
+                usable_strategies['mp'](game, split_depth)
+
+
+class IterativeDeepeningUnitTests(MinimaxPositionTests, unittest.TestCase):
+    strategy = staticmethod(usable_strategies['id'])
+
+    def test_stonehenge_time_limit(self):
+        """
+        Test that a move on a large Stonehenge board is returned within a
+        small multiple of the time limit.
+        """
+        game = StonehengeGame(True, 5)
+
+        start = time.perf_counter()
+        move = usable_strategies['id'](game, 0.1)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertTrue(game.current_state.is_valid_move(move))
+
+
+class MCTSUnitTests(unittest.TestCase):
+    def test_stonehenge_one_winning_move(self):
+        """
+        Test on a game of Stonehenge where there is only 1 winning move that
+        is immediately in sight.
+        """
+        game = StonehengeGame(False, 3)
+        for move in ['K', 'A', 'C', 'B', 'F', 'E', 'G', 'D', 'I']:
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move))
+
+        move = usable_strategies['mc'](game, 500, None, seed=0)
+        self.assertEqual(move, game.str_to_move("H"))
+
+    def test_subtract_square_4(self):
+        """
+        Test on a game of SubtractSquare with a value of 4, where the winning
+        move is immediately in sight.
+        """
+        game = SubtractSquareGame(True, 4)
+
+        move = usable_strategies['mc'](game, 200, None, seed=0)
+        self.assertEqual(move, game.str_to_move("4"))
+
+
+class SearchStatsUnitTests(unittest.TestCase):
+    def setUp(self):
+        strategy.TRANSPOSITION_TABLE.clear()
+
+    def test_recursive_and_iterative_agree(self):
+        """
+        Test that recursive and iterative minimax record the same search, in
+        both games.
+        """
+        for game in [StonehengeGame(True, 2), SubtractSquareGame(True, 20)]:
+            strategy.TRANSPOSITION_TABLE.clear()
+            stats_r, stats_i = SearchStats(), SearchStats()
+            usable_strategies['mr'](game, stats_r)
+            strategy.TRANSPOSITION_TABLE.clear()
+            usable_strategies['mi'](game, stats_i)
+            result_r, result_i = stats_r.to_dict(), stats_i.to_dict()
+            del result_r['phase_times'], result_i['phase_times']
+            self.assertEqual(result_r, result_i)
+            self.assertGreater(stats_r.cache_misses, 0)
+            if isinstance(game, StonehengeGame):
+                self.assertGreater(stats_r.cache_hits, 0)
+
+    def test_parallel_records_workers(self):
+        """
+        Test that parallel minimax records the splitting and the workers'
+        searches as one tree.
+        """
+        game = StonehengeGame(False, 2)
+        stats = SearchStats()
+        usable_strategies['mp'](game, 2, 2, stats)
+        self.assertEqual(stats.nodes, stats.children + 1)
+        self.assertGreater(stats.max_depth, 2)
+        self.assertEqual(set(stats.phase_times), {'split', 'search'})
+
+    def test_iterative_deepening_records_each_depth(self):
+        """
+        Test that iterative deepening records a phase for each depth it
+        searched, with the root visited once per depth.
+        """
+        game = StonehengeGame(False, 2)
+        stats = SearchStats()
+        usable_strategies['id'](game, 1.0, stats)
+        depths = len(stats.phase_times)
+        self.assertEqual(set(stats.phase_times),
+                         {'depth {}'.format(d) for d in range(1, depths + 1)})
+        self.assertLessEqual(stats.nodes, stats.children + depths)
+        self.assertLessEqual(stats.max_depth, depths)
+
+    def test_mcts_records_tree_and_playouts(self):
+        """
+        Test that MCTS records a node per tree node and every playout.
+        """
+        game = StonehengeGame(False, 2)
+        stats = SearchStats()
+        usable_strategies['mc'](game, 300, None, 4, seed=0, stats=stats)
+        self.assertEqual(stats.playouts, 1200)
+        self.assertLessEqual(stats.nodes, 301)
+        self.assertLessEqual(stats.nodes, stats.children + 1)
+        self.assertIn('search', stats.phase_times)
+
+    def test_counts_are_consistent(self):
+        """
+        Test that every node but the root is a generated child, all of
+        which are visited unless alpha-beta prunes them.
+        """
+        game = StonehengeGame(False, 2)
+        for key in ['mr', 'mi', 'ab', 'ro']:
+            stats = SearchStats()
+            usable_strategies[key](game, stats)
+            if key == 'ab':
+                self.assertLessEqual(stats.nodes, stats.children + 1)
+            else:
+                self.assertEqual(stats.nodes, stats.children + 1)
+            self.assertLessEqual(stats.terminal + stats.expanded, stats.nodes)
+            self.assertGreaterEqual(stats.effective_branching, 1.0)
+            self.assertIn('search' if key != 'ro' else 'evaluate',
+                          stats.phase_times)
+
+
+class SharedGameUnitTests(unittest.TestCase):
+    def test_searches_leave_game_unchanged(self):
+        """
+        Test that the searches never assign to the game they search, so
+        that one game can be shared by concurrent searches.
+        """
+        class FrozenGame(StonehengeGame):
+            def __setattr__(self, name, value):
+                raise AssertionError('search assigned game.' + name)
+
+        game = StonehengeGame(True, 2)
+        for move in ['A', 'F']:
+            game.current_state = game.current_state.make_move(move)
+        game.__class__ = FrozenGame
+        for key in ['mr', 'mi', 'ab', 'id', 'ro']:
+            strategy.TRANSPOSITION_TABLE.clear()
+            strategy.ALPHA_BETA_TABLE.clear()
+            self.assertTrue(game.current_state.is_valid_move(
+                usable_strategies[key](game)))
+        self.assertTrue(game.current_state.is_valid_move(
+            usable_strategies['mc'](game, 200, None, seed=0)))
+
+    def test_concurrent_searches_share_table(self):
+        """
+        Test that searches in several threads can share one game and one
+        table small enough to evict entries throughout.
+        """
+        game = StonehengeGame(True, 2)
+        states = [game.current_state.make_move(move) for move in 'ABCDEFG']
+        expected = [strategy.state_score_r(game, s) for s in states]
+        table = TranspositionTable(16)
+        # Switch threads as often as possible, to interleave table updates.
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(4) as executor:
+                for _ in range(3):
+                    self.assertEqual(list(executor.map(
+                        partial(strategy.state_score_r, game, table=table),
+                        states)), expected)
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(len(table), 16)
+
+    def test_concurrent_subtract_square_moves(self):
+        """
+        Test that SubtractSquare states in several threads, each extending
+        the shared list of squares, generate the right moves, and that
+        minimax still chooses winning moves in threads.
+        """
+        expected = [i * i for i in range(1, 10 ** 4 + 1)]
+        barrier = threading.Barrier(4)
+
+        def moves_at(total):
+            barrier.wait()
+            return SubtractSquareState(True, total).get_possible_moves()
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(4) as executor:
+                for _ in range(10):
+                    with patch.object(subtract_square_state, 'SQUARES',
+                                      [1, 4]):
+                        for moves in executor.map(
+                                moves_at, [10 ** 8 + i for i in range(4)]):
+                            self.assertEqual(moves, expected)
+                        # Extra or misplaced squares would be read later.
+                        self.assertEqual(subtract_square_state.SQUARES,
+                                         expected)
+                totals = [10 ** 5 + 7 * i for i in range(8)]
+                moves = list(executor.map(
+                    lambda total: usable_strategies['mr'](
+                        SubtractSquareGame(True, total)), totals))
+        finally:
+            sys.setswitchinterval(interval)
+        for total, move in zip(totals, moves):
+            self.assertIn(move, SOLVER.winning_moves(total))
+
+    def test_terminal_values(self):
+        """
+        Test that both games score finished states for the player to move
+        without looking at their current state.
+        """
+        game = SubtractSquareGame(True, 10)
+        finished = game.current_state.make_move(9).make_move(1)
+        self.assertEqual(game.winner(finished), 'p2')
+        self.assertEqual(game.terminal_value(finished), -1)
+        self.assertIsNone(game.winner(game.current_state))
+
+        game = StonehengeGame(False, 1)
+        finished = game.current_state.make_move('B')
+        self.assertEqual(game.winner(finished), 'p2')
+        self.assertEqual(game.terminal_value(finished), -1)
+        self.assertEqual(game.current_state, StonehengeState(False, 1))
+
+
+class GameConstructionUnitTests(unittest.TestCase):
+    @patch('builtins.input', side_effect=AssertionError('asked for input'))
+    def test_from_state(self, input):
+        """
+        Test that from_state wraps a state in a playable game of the class
+        it is called on, without asking for input.
+        """
+        state = StonehengeState(True, 2).make_move('A').make_move('F')
+        game = StonehengeGame.from_state(state)
+        self.assertIsInstance(game, StonehengeGame)
+        self.assertIs(game.current_state, state)
+        self.assertFalse(game.is_over(state))
+        self.assertTrue(state.is_valid_move(usable_strategies['mr'](game)))
+
+        game = SubtractSquareGame.from_state(
+            SubtractSquareGame(True, 18).current_state)
+        self.assertIsInstance(game, SubtractSquareGame)
+        self.assertIn(usable_strategies['ab'](game), [1, 16])
+
+    def test_side_length_bounds(self):
+        """
+        Test that StonehengeGame only accepts boards whose cells all have
+        names.
+        """
+        self.assertEqual(StonehengeGame(True, MAX_SIDE_LENGTH).current_state.
+                         board_size, MAX_SIDE_LENGTH)
+        for side_length in [0, MAX_SIDE_LENGTH + 1]:
+            with self.assertRaises(ValueError):
+                StonehengeGame(True, side_length)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,15 +12,19 @@ class SubtractSquareGame(Game):
     Abstract class for a game to be played with two players.
     """
 
-    def __init__(self, p1_starts):
+    def __init__(self, p1_starts, count=None):
         """
         Initialize this Game, using p1_starts to find who the first player is.
 
         :param p1_starts: A boolean representing whether Player 1 is the first
                           to make a move.
         :type p1_starts: bool
+        :param count: The number to subtract from, which is asked for if it
+                      is None.
+        :type count: int | None
         """
-        count = int(input("Enter the number to subtract from: "))
+        if count is None:
+            count = int(input("Enter the number to subtract from: "))
         self.current_state = SubtractSquareState(p1_starts, count)
 
     def get_instructions(self):
@@ -57,6 +61,33 @@ class SubtractSquareGame(Game):
         return (self.current_state.get_current_player_name() != player
                 and self.is_over(self.current_state))
 
+    def winner(self, state):
+        """
+        Return the player who has won at state: the player who subtracted
+        to 0, who is not the player whose turn it is. Does not use
+        current_state.
+
+        :param state: The state to check.
+        :type state: SubtractSquareState
+        :return: 'p1' or 'p2', or None if the game is not over at state.
+        :rtype: str | None
+        """
+        if state.current_total != 0:
+            return None
+        return 'p2' if state.p1_turn else 'p1'
+
+    def terminal_value(self, state):
+        """
+        Return the score of state, a state where this game is over, for the
+        player whose turn it is at state. That player has always lost.
+
+        :param state: The state to score.
+        :type state: SubtractSquareState
+        :return: -1
+        :rtype: int
+        """
+        return -1
+
     def str_to_move(self, string):
         """
         Return the move that string represents. If string is not a move,
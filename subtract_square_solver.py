@@ -0,0 +1,130 @@
+"""
+An exact solver for SubtractSquare.
+
+A total is winning for the player to move exactly when some square can be
+subtracted from it to leave a losing total, and 0 is losing. The solver
+fills a table of every total up to a limit with a sieve: the next losing
+total is the next one not yet marked winning, and every total a square
+above it is then marked winning in one vectorized step.
+
+NumPy is used for the marking when it is installed; otherwise the solver
+falls back to plain Python, which gives the same table more slowly.
+
+NOTE: You do not have to run python-ta on this file.
+"""
+import threading
+from math import isqrt
+from typing import List
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - depends on the environment
+    numpy = None
+
+
+def winning_totals(limit: int) -> bytearray:
+    """
+    Return a bytearray whose entry n is 1 if the player to move at total n
+    wins SubtractSquare with perfect play, and 0 if they lose, for every n
+    from 0 to limit.
+
+    >>> list(winning_totals(10))
+    [0, 1, 0, 1, 1, 0, 1, 0, 1, 1, 0]
+    """
+    table = bytearray(limit + 1)
+    # find() scans the bytearray at C speed, and NumPy marks through a view
+    # of the same memory.
+    view = None if numpy is None else numpy.frombuffer(table, numpy.uint8)
+    squares = [i * i for i in range(1, isqrt(limit) + 1)]
+    offsets = None if numpy is None else numpy.array(squares, numpy.int64)
+    total = table.find(0)
+    while total != -1:
+        count = isqrt(limit - total)
+        if view is not None:
+            view[total + offsets[:count]] = 1
+        else:
+            for square in squares[:count]:
+                table[total + square] = 1
+        total = table.find(0, total + 1)
+    return table
+
+
+class SubtractSquareSolver:
+    """
+    A table of the exact scores of SubtractSquare totals, extended as larger
+    totals are asked about. A lock guards the extension, so one solver can
+    be shared by searches running in several threads.
+
+    limit - the largest total currently in the table
+    """
+    limit: int
+
+    def __init__(self, limit: int = 1024) -> None:
+        """
+        Create a solver whose table covers totals up to limit.
+        """
+        self.limit = limit
+        self._initial_limit = limit
+        self._table = winning_totals(limit)
+        self._lock = threading.Lock()
+
+    def score(self, total: int) -> int:
+        """
+        Return the score, 1 for a win or -1 for a loss, of the player to move
+        at total, in O(1) once total is within the table.
+
+        >>> solver = SubtractSquareSolver(10)
+        >>> solver.score(18), solver.score(20)
+        (1, -1)
+        >>> solver.limit
+        20
+        """
+        if total > self.limit:
+            with self._lock:
+                if total > self.limit:
+                    # Grow at least geometrically, so that rebuilding the
+                    # table as totals rise costs a constant factor overall.
+                    limit = max(total, 2 * self.limit)
+                    # Readers check limit before reading _table, so the
+                    # larger table must be in place before limit is raised.
+                    self._table = winning_totals(limit)
+                    self.limit = limit
+        return 1 if self._table[total] else -1
+
+    def clear(self) -> None:
+        """
+        Forget the totals solved since this solver was created, shrinking
+        its table back to the limit it was created with. Unlike score, this
+        must not be called while other threads use this solver.
+
+        >>> solver = SubtractSquareSolver(10)
+        >>> solver.score(100)
+        1
+        >>> solver.clear()
+        >>> solver.limit
+        10
+        """
+        with self._lock:
+            self.limit = self._initial_limit
+            self._table = winning_totals(self._initial_limit)
+
+    def winning_moves(self, total: int) -> List[int]:
+        """
+        Return the squares that can be subtracted from total to leave the
+        opponent a losing total.
+
+        >>> SubtractSquareSolver().winning_moves(18)
+        [1, 16]
+        """
+        self.score(total)
+        return [i * i for i in range(1, isqrt(total) + 1)
+                if not self._table[total - i * i]]
+
+
+# The solver shared by every SubtractSquareState
+SOLVER = SubtractSquareSolver()
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
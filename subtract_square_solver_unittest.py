@@ -0,0 +1,84 @@
+"""
+Unittests for the exact SubtractSquare solver.
+"""
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import subtract_square_solver
+from strategy import recursive_minimax_strategy
+from subtract_square_game import SubtractSquareGame
+from subtract_square_solver import SubtractSquareSolver, winning_totals
+
+
+def brute_force(limit):
+    """
+    Return whether the player to move wins at each total up to limit, found
+    directly from the definition of a winning total.
+    """
+    wins = []
+    for total in range(limit + 1):
+        wins.append(any(not wins[total - i * i]
+                        for i in range(1, int(total ** 0.5) + 1)))
+    return wins
+
+
+class SubtractSquareSolverUnitTests(unittest.TestCase):
+    def test_table_matches_brute_force(self):
+        """
+        Test that the sieve agrees with the definition of a winning total.
+        """
+        expected = [int(win) for win in brute_force(2000)]
+        self.assertEqual(list(winning_totals(2000)), expected)
+
+    def test_table_without_numpy(self):
+        """
+        Test that the pure-Python sieve gives the same table as NumPy.
+        """
+        with patch.object(subtract_square_solver, 'numpy', None):
+            table = winning_totals(2000)
+        self.assertEqual(table, winning_totals(2000))
+
+    def test_table_grows(self):
+        """
+        Test that totals past the table's limit are scored correctly.
+        """
+        solver = SubtractSquareSolver(10)
+        wins = brute_force(500)
+        for total in [11, 499, 37, 200]:
+            self.assertEqual(solver.score(total), 1 if wins[total] else -1)
+
+    def test_table_grows_in_several_threads(self):
+        """
+        Test that threads growing one solver's table together all read
+        complete tables.
+        """
+        expected = winning_totals(4000)
+        interval = sys.getswitchinterval()
+        # Switch threads as often as possible, to interleave the growth.
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(4) as executor:
+                for _ in range(10):
+                    solver = SubtractSquareSolver(10)
+                    totals = list(range(4000, 11, -37))
+                    self.assertEqual(
+                        list(executor.map(solver.score, totals)),
+                        [1 if expected[t] else -1 for t in totals])
+        finally:
+            sys.setswitchinterval(interval)
+
+    def test_minimax_large_total(self):
+        """
+        Test that minimax plays a winning move from a total far too large to
+        search.
+        """
+        game = SubtractSquareGame(True, 100000)
+        move = recursive_minimax_strategy(game)
+        self.assertIn(int(move),
+                      SubtractSquareSolver().winning_moves(100000))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,8 +3,20 @@ An implementation of a state for SubtractSquare.
 
 NOTE: You do not have to run python-ta on this file.
 """
-from typing import Any
-from game_state import GameState
+import threading
+from itertools import islice
+from math import isqrt
+from typing import Any, Iterator, List
+from game_state import GameState, zobrist_keys
+from subtract_square_solver import SOLVER
+
+# Zobrist key toggled when it is player 1's turn
+TURN_KEY = zobrist_keys(1, 0)[0]
+# The positive squares in increasing order, extended by _extend_squares as
+# larger totals are reached
+SQUARES = [i * i for i in range(1, 33)]
+# Held while SQUARES is extended, so that threads extend it one at a time
+_SQUARES_LOCK = threading.Lock()
 
 
 class SubtractSquareState(GameState):
@@ -19,6 +31,8 @@ class SubtractSquareState(GameState):
         """
         super().__init__(is_p1_turn)
         self.current_total = current_total
+        self.zobrist = mix_total(current_total) ^ (TURN_KEY if is_p1_turn
+                                                   else 0)
 
     def __str__(self) -> str:
         """
@@ -26,16 +40,29 @@ class SubtractSquareState(GameState):
         """
         return "Current total: {}".format(self.current_total)
 
-    def get_possible_moves(self) -> list:
+    def get_possible_moves(self) -> List[int]:
         """
         Return all possible moves that can be applied to this state.
+
+        >>> SubtractSquareState(True, 10).get_possible_moves()
+        [1, 4, 9]
+        """
+        return squares_up_to(self.current_total)
+
+    def iter_possible_moves(self) -> Iterator[int]:
         """
-        moves = []
-        for i in range(1, self.current_total + 1):
-            if i ** 2 <= self.current_total:
-                moves.append(i ** 2)
+        Return an iterator over the possible moves of this state, in the
+        order of get_possible_moves, without building a list of them.
 
-        return moves
+        >>> list(SubtractSquareState(True, 10).iter_possible_moves())
+        [1, 4, 9]
+        >>> list(SubtractSquareState(True, -1).iter_possible_moves())
+        []
+        """
+        total = self.current_total
+        count = isqrt(total) if total > 0 else 0
+        _extend_squares(count)
+        return islice(SQUARES, count)
 
     def make_move(self, move: Any) -> "SubtractSquareState":
         """
@@ -56,21 +83,61 @@ class SubtractSquareState(GameState):
         return "P1's Turn: {} - Total: {}".format(self.p1_turn,
                                                   self.current_total)
 
+    def known_score(self) -> int:
+        """
+        Return the exact score of this state for the current player, from
+        the table of SubtractSquare totals solved by SOLVER.
+
+        >>> SubtractSquareState(True, 18).known_score()
+        1
+        >>> SubtractSquareState(True, 2).known_score()
+        -1
+        """
+        return SOLVER.score(self.current_total)
+
+    def __eq__(self, other: Any) -> bool:
+        """
+        Return whether other is the same position as this state.
+        """
+        return type(other) is SubtractSquareState and \
+            self.p1_turn == other.p1_turn and \
+            self.current_total == other.current_total
+
+    def __hash__(self) -> int:
+        """
+        Return a hash of this state, consistent with __eq__.
+        """
+        return self.zobrist
+
     def rough_outcome(self) -> float:
         """
         Return an estimate in interval [LOSE, WIN] of best outcome the current
         player can guarantee from state self.
         """
-        if is_pos_square(self.current_total):
+        total = self.current_total
+        if is_pos_square(total):
             return self.WIN
-        elif all([is_pos_square(self.current_total - n ** 2)
-                  for n in range(1, self.current_total + 1)
-                  if n ** 2 < self.current_total]):
+        elif all(is_pos_square(total - square)
+                 for square in squares_up_to(total) if square < total):
             return self.LOSE
 
         return self.DRAW
 
 
+def mix_total(n: int) -> int:
+    """
+    Return a well-mixed 64-bit hash of the total n (SplitMix64 finalizer).
+    Totals are unbounded, so this stands in for a table of Zobrist keys.
+
+    >>> mix_total(5) == mix_total(5) and mix_total(5) != mix_total(6)
+    True
+    """
+    n = (n + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    n = ((n ^ (n >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    n = ((n ^ (n >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return n ^ (n >> 31)
+
+
 def is_pos_square(n: int) -> bool:
     """
     Return whether n is a positive perfect square
@@ -80,7 +147,33 @@ def is_pos_square(n: int) -> bool:
     >>> is_pos_square(9)
     True
     """
-    return 0 < n and (round(n ** 0.5) ** 2 == n)
+    return 0 < n and isqrt(n) ** 2 == n
+
+
+def squares_up_to(n: int) -> List[int]:
+    """
+    Return the positive squares no greater than n, in increasing order.
+
+    >>> squares_up_to(17)
+    [1, 4, 9, 16]
+    >>> squares_up_to(0)
+    []
+    """
+    count = isqrt(n) if n > 0 else 0
+    _extend_squares(count)
+    return SQUARES[:count]
+
+
+def _extend_squares(count: int) -> None:
+    """
+    Extend SQUARES to hold at least the first count positive squares. The
+    new squares are added in one call, so that other threads never see
+    SQUARES part way through the extension.
+    """
+    if count > len(SQUARES):
+        with _SQUARES_LOCK:
+            start = len(SQUARES) + 1
+            SQUARES.extend([i * i for i in range(start, count + 1)])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+"""
+Unittests for the symmetries of Stonehenge boards and the canonical forms of
+Stonehenge positions.
+"""
+import random
+import unittest
+
+from benchmark import random_state
+from stonehenge import StonehengeGame, StonehengeState, canonicalize, \
+    create_state, permute_bits, topology
+from strategy import state_score_r
+from transposition_table import TranspositionTable
+
+
+def transform(state: StonehengeState, index: int) -> StonehengeState:
+    """
+    Return state with the symmetry at index of its topology applied.
+    """
+    cells, lines = state.topology.symmetries[index]
+    return create_state(state.p1_turn, state.board_size,
+                        permute_bits(state.p1_cells, cells),
+                        permute_bits(state.p2_cells, cells),
+                        permute_bits(state.p1_lines, lines),
+                        permute_bits(state.p2_lines, lines))
+
+
+class SymmetryUnitTests(unittest.TestCase):
+    def test_symmetries_map_ley_lines_to_ley_lines(self):
+        """
+        Test that each symmetry maps the cells of every ley-line onto the
+        cells of the ley-line it names.
+        """
+        for board_size in range(1, 6):
+            topo = topology(board_size)
+            self.assertEqual(len(set(topo.symmetries)), 6)
+            for cells, lines in topo.symmetries:
+                self.assertEqual(sorted(cells), list(range(len(topo.cells))))
+                for i, line in enumerate(topo.lines):
+                    self.assertEqual(sorted(cells[x] for x in line),
+                                     sorted(topo.lines[lines[i]]))
+
+    def test_symmetric_states_share_canonical_form(self):
+        """
+        Test that every rotation and reflection of a state has the same
+        canonical form, with the same hash.
+        """
+        rng = random.Random(0)
+        for board_size in range(1, 6):
+            for _ in range(20):
+                state = random_state(rng, board_size, rng.randint(0, 8))
+                canonical = canonicalize(state)[0]
+                for index in range(6):
+                    other = canonicalize(transform(state, index))[0]
+                    self.assertEqual(other, canonical)
+                    self.assertEqual(hash(other), hash(canonical))
+
+    def test_canonical_form_has_same_value(self):
+        """
+        Test that a state and its canonical form have the same minimax score.
+        """
+        game = StonehengeGame(True, 3)
+        rng = random.Random(1)
+        for board_size in range(1, 4):
+            for _ in range(10):
+                state = random_state(rng, board_size, rng.randint(3, 6))
+                table = TranspositionTable()
+                self.assertEqual(state_score_r(game, state, table),
+                                 state_score_r(game, state.canonical(), table))
+
+    def test_moves_map_back_to_original(self):
+        """
+        Test that a move in the canonical form and the move it maps to in the
+        original state lead to states with the same canonical form.
+        """
+        rng = random.Random(2)
+        for board_size in range(1, 6):
+            for _ in range(10):
+                state = random_state(rng, board_size, rng.randint(0, 5))
+                canonical, moves = canonicalize(state)
+                for move in canonical.get_possible_moves():
+                    self.assertIn(moves[move], state.get_possible_moves())
+                    self.assertEqual(
+                        canonical.make_move(move).canonical(),
+                        state.make_move(moves[move]).canonical())
+
+
+class SymmetricTableUnitTests(unittest.TestCase):
+    def test_symmetric_states_share_entry(self):
+        """
+        Test that an entry stored for a state is found for each of its
+        rotations and reflections, and not by a table without symmetry.
+        """
+        rng = random.Random(3)
+        for board_size in range(2, 6):
+            state = random_state(rng, board_size, 4)
+            symmetric, plain = TranspositionTable(symmetric=True), \
+                TranspositionTable()
+            symmetric.put(state, 1)
+            plain.put(state, 1)
+            for index in range(6):
+                other = transform(state, index)
+                self.assertEqual(symmetric.get(other), 1)
+                if other != state:
+                    self.assertIsNone(plain.get(other))
+            self.assertEqual(len(symmetric), 1)
+
+    def test_same_scores_as_plain_table(self):
+        """
+        Test that state_score_r gives the same scores with a symmetric table
+        as with a plain one, while storing fewer entries.
+        """
+        game = StonehengeGame(True, 2)
+        rng = random.Random(4)
+        symmetric, plain = TranspositionTable(symmetric=True), \
+            TranspositionTable()
+        states = [StonehengeState(True, 2)] + \
+            [random_state(rng, board_size, rng.randint(2 * board_size, 8))
+             for board_size in [2, 3] for _ in range(10)]
+        for state in states:
+            self.assertEqual(state_score_r(game, state, symmetric),
+                             state_score_r(game, state, plain))
+        self.assertLess(len(symmetric), len(plain))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+"""
+Endgame tablebases for small Stonehenge boards.
+
+A tablebase holds the exact score of every position reachable on a board of
+one size, for the player whose turn it is, so that play on that board needs
+no search at all. Positions are stored by the canonical form of their
+symmetry class (see stonehenge.canonicalize), which shrinks a table about
+six-fold.
+
+Generate tablebases offline, for board sizes 1 to 3, with
+
+    python tablebase.py 1 2 3
+
+which writes them to TABLEBASE_DIR for tablebase_strategy to find.
+"""
+import argparse
+import os
+import struct
+import time
+from array import array
+from typing import Any, Dict, List, Set, Union
+from stonehenge import StonehengeGame, StonehengeState
+from strategy import alpha_beta_strategy
+
+TABLEBASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'tablebases')
+# File header: magic, format version, board size, number of positions
+MAGIC = b'SHTB'
+VERSION = 1
+HEADER = struct.Struct('<4sBBQ')
+
+
+def pack(state: StonehengeState) -> int:
+    """
+    Return state packed into a single int, unique among states of its board
+    size. Positions on boards up to size 3 pack into 64 bits.
+
+    >>> pack(StonehengeState(True, 1))
+    1
+    >>> pack(StonehengeState(False, 1).make_move('A'))
+    8243
+    """
+    topo = state.topology
+    num_cells, num_lines = len(topo.cells), len(topo.lines)
+    key = state.p1_cells << num_cells | state.p2_cells
+    key = (key << num_lines | state.p1_lines) << num_lines | state.p2_lines
+    return key << 1 | state.p1_turn
+
+
+def tablebase_path(board_size: int) -> str:
+    """
+    Return the path of the tablebase file for boards of size board_size.
+    """
+    return os.path.join(TABLEBASE_DIR,
+                        'stonehenge_{}.tb'.format(board_size))
+
+
+class Tablebase:
+    """
+    The exact scores of the positions on a Stonehenge board of one size.
+
+    board_size - length of the board's sides
+    values - score for the player to move, by packed canonical position
+    """
+    board_size: int
+    values: Dict[int, int]
+
+    def __init__(self, board_size: int, values: Dict[int, int]) -> None:
+        """
+        Create a Tablebase for boards of size board_size holding values.
+        """
+        self.board_size = board_size
+        self.values = values
+
+    def __len__(self) -> int:
+        """
+        Return the number of positions in this tablebase.
+        """
+        return len(self.values)
+
+    def probe(self, state: Any) -> Union[int, None]:
+        """
+        Return the score of state for the player whose turn it is, or None
+        if state is not a position in this tablebase.
+
+        >>> table = generate(1)
+        >>> table.probe(StonehengeState(True, 1))
+        1
+        >>> table.probe(StonehengeState(True, 1).make_move('A'))
+        -1
+        >>> table.probe(StonehengeState(True, 2)) is None
+        True
+        """
+        if not isinstance(state, StonehengeState) or \
+                state.board_size != self.board_size:
+            return None
+        return self.values.get(pack(state.canonical()))
+
+    def save(self, path: str) -> None:
+        """
+        Write this tablebase to path: a header, then the packed positions in
+        ascending order as 64-bit ints, then their scores as bytes.
+        """
+        keys = array('Q', sorted(self.values))
+        scores = array('b', [self.values[key] for key in keys])
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.board_size,
+                                   len(keys)))
+            keys.tofile(file)
+            scores.tofile(file)
+
+    @staticmethod
+    def load(path: str) -> 'Tablebase':
+        """
+        Return the tablebase written to path by Tablebase.save.
+        """
+        with open(path, 'rb') as file:
+            magic, version, board_size, count = HEADER.unpack(
+                file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError('{} is not a tablebase file'.format(path))
+            keys, scores = array('Q'), array('b')
+            keys.fromfile(file, count)
+            scores.fromfile(file, count)
+        return Tablebase(board_size, dict(zip(keys, scores)))
+
+
+def generate(board_size: int) -> Tablebase:
+    """
+    Return the tablebase for boards of size board_size. Every position
+    reachable with either player starting is enumerated, one layer per
+    number of moves made, and then scored from the last layer back to the
+    first, so that each position is scored from the already-known scores of
+    the positions its moves lead to.
+
+    >>> len(generate(1))
+    4
+    """
+    game = StonehengeGame(True, board_size)
+    layers: List[Set[StonehengeState]] = [
+        {StonehengeState(True, board_size).canonical(),
+         StonehengeState(False, board_size).canonical()}]
+    while layers[-1]:
+        layers.append({state.make_move(move).canonical()
+                       for state in layers[-1]
+                       for move in state.get_possible_moves()})
+    values = {}
+    for layer in reversed(layers):
+        for state in layer:
+            moves = state.get_possible_moves()
+            if moves:
+                values[pack(state)] = max(
+                    [-values[pack(state.make_move(m).canonical())]
+                     for m in moves])
+            else:
+                values[pack(state)] = game.terminal_value(state)
+    return Tablebase(board_size, values)
+
+
+_TABLEBASES: Dict[int, Union[Tablebase, None]] = {}
+
+
+def get_tablebase(board_size: int) -> Union[Tablebase, None]:
+    """
+    Return the tablebase for boards of size board_size from TABLEBASE_DIR,
+    loading it on first use, or None if it has not been generated.
+    """
+    if board_size not in _TABLEBASES:
+        path = tablebase_path(board_size)
+        _TABLEBASES[board_size] = Tablebase.load(path) \
+            if os.path.exists(path) else None
+    return _TABLEBASES[board_size]
+
+
+def tablebase_strategy(game: Any) -> Any:
+    """
+    Return a move for game that leads to a win, if a win is possible, by
+    looking up the positions its moves lead to in the tablebase for its
+    board. The move is the one minimax would return. Games without a
+    generated tablebase are searched with alpha_beta_strategy instead.
+    """
+    state = game.current_state
+    table = get_tablebase(state.board_size) \
+        if isinstance(state, StonehengeState) else None
+    if table is None:
+        return alpha_beta_strategy(game)
+    moves = state.get_possible_moves()
+    scores = [-table.probe(state.make_move(m)) for m in moves]
+    return moves[scores.index(max(scores))]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Generate Stonehenge endgame tablebases.')
+    parser.add_argument('sizes', type=int, nargs='+', choices=[1, 2, 3],
+                        help='board sizes to generate tablebases for')
+    args = parser.parse_args()
+    os.makedirs(TABLEBASE_DIR, exist_ok=True)
+    for size in args.sizes:
+        start = time.perf_counter()
+        tablebase = generate(size)
+        tablebase.save(tablebase_path(size))
+        print('Board size {}: {} positions in {:.1f}s, written to {}'.format(
+            size, len(tablebase), time.perf_counter() - start,
+            tablebase_path(size)))
@@ -0,0 +1,60 @@
+"""
+Unittests for the Stonehenge endgame tablebases.
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from stonehenge import StonehengeGame, StonehengeState
+from strategy import state_score_r, recursive_minimax_strategy
+from tablebase import Tablebase, generate, tablebase_strategy
+from transposition_table import TranspositionTable
+
+
+class TablebaseUnitTests(unittest.TestCase):
+    def test_scores_match_minimax(self):
+        """
+        Test that every position reachable on a board of size 2 has the score
+        minimax gives it.
+        """
+        game = StonehengeGame(True, 2)
+        tablebase = generate(2)
+        table = TranspositionTable()
+        layer = {StonehengeState(True, 2), StonehengeState(False, 2)}
+        while layer:
+            for state in layer:
+                self.assertEqual(tablebase.probe(state),
+                                 state_score_r(game, state, table))
+            layer = {s.make_move(m) for s in layer
+                     for m in s.get_possible_moves()}
+
+    def test_save_and_load(self):
+        """
+        Test that a tablebase written to disk loads back unchanged.
+        """
+        tablebase = generate(2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stonehenge_2.tb')
+            tablebase.save(path)
+            loaded = Tablebase.load(path)
+        self.assertEqual(loaded.board_size, 2)
+        self.assertEqual(loaded.values, tablebase.values)
+
+    def test_strategy_same_move_as_minimax(self):
+        """
+        Test that the move chosen from the tablebase is the one chosen by
+        recursive minimax.
+        """
+        game = StonehengeGame(True, 2)
+        for move in ['A', 'F', 'D']:
+            game.current_state = game.current_state.make_move(move)
+        tablebase = generate(2)
+
+        with patch('tablebase.get_tablebase', return_value=tablebase):
+            self.assertEqual(tablebase_strategy(game),
+                             recursive_minimax_strategy(game))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+A transposition table for caching the scores of game states found by
+minimax, so that a position reached through different move orders is only
+solved once.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Union
+
+
+class TranspositionTable:
+    """
+    A bounded map from game states to their scores, keyed on the states'
+    Zobrist hashes. When the table is full, the least recently used entry is
+    evicted to make room for a new one. A lock guards the entries, so one
+    table can be shared by searches running in several threads.
+
+    max_size - the most entries kept at once
+    symmetric - whether states are stored under their canonical() form, so
+                that symmetric positions share one entry
+    hits - number of lookups that found a score
+    misses - number of lookups that found nothing
+    """
+    max_size: int
+    symmetric: bool
+    hits: int
+    misses: int
+
+    def __init__(self, max_size: int = 1 << 18,
+                 symmetric: bool = False) -> None:
+        """
+        Create an empty TranspositionTable that keeps at most max_size
+        entries, storing states under their canonical() form if symmetric.
+        Only use symmetric for entries whose values do not change under the
+        symmetries, such as scores but not moves.
+
+        >>> table = TranspositionTable(10)
+        >>> len(table), table.hits, table.misses
+        (0, 0, 0)
+        """
+        if max_size < 1:
+            raise ValueError('max_size must be positive')
+        self.max_size = max_size
+        self.symmetric = symmetric
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """
+        Return the number of entries in this table.
+        """
+        return len(self._entries)
+
+    def get(self, state: Any) -> Union[Any, None]:
+        """
+        Return the score stored for state, or None if there is none.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> table = TranspositionTable(10)
+        >>> table.get(SubtractSquareState(True, 4)) is None
+        True
+        >>> table.put(SubtractSquareState(True, 4), 1)
+        >>> table.get(SubtractSquareState(True, 4))
+        1
+        >>> table.hits, table.misses
+        (1, 1)
+        """
+        if self.symmetric:
+            state = state.canonical()
+        with self._lock:
+            score = self._entries.get(state)
+            if score is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(state)
+                self.hits += 1
+        return score
+
+    def put(self, state: Any, score: Any) -> None:
+        """
+        Store score for state, evicting the least recently used entry if the
+        table is full.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> table = TranspositionTable(2)
+        >>> table.put(SubtractSquareState(True, 1), 1)
+        >>> table.put(SubtractSquareState(True, 2), -1)
+        >>> table.get(SubtractSquareState(True, 1))
+        1
+        >>> table.put(SubtractSquareState(True, 3), 1)
+        >>> table.get(SubtractSquareState(True, 2)) is None
+        True
+        >>> len(table)
+        2
+        """
+        if self.symmetric:
+            state = state.canonical()
+        with self._lock:
+            self._entries[state] = score
+            self._entries.move_to_end(state)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Remove every entry from this table and reset its counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
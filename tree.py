@@ -8,12 +8,14 @@ from typing import Union, List
 class Tree:
     """
     A bare-bones Tree ADT that identifies the root with the entire tree.
-    Specialized for iterative minimax.
+    Specialized for iterative minimax, which creates one per game state, so
+    it keeps its attributes in slots rather than a per-instance dict.
 
     value - value of root node
     children - child nodes
     score - score of the state
     """
+    __slots__ = ('value', 'children', 'score')
     value: object
     children: Union[List['Tree'], None]
     score: Union[int, None]
@@ -21,7 +23,8 @@ class Tree:
     def __init__(self, value: object = None, children: List['Tree'] = None) ->\
             None:
         """
-        Create Tree self with content value and 0 or more children
+        Create Tree self with content value and 0 or more children. The
+        children list is used as given, not copied.
 
         >>> t = Tree(5, [Tree(1), Tree(2)])
         >>> t.value
@@ -32,7 +35,7 @@ class Tree:
         []
         """
         self.value = value
-        self.children = children[:] if children is not None else []
+        self.children = children if children is not None else []
         self.score = None
 
 